@@ -0,0 +1,151 @@
+"""
+Benchmark create_itsmf_apac_map across synthetic data sizes.
+
+    python benchmarks/bench_map.py --sizes 10 1000 10000 100000 --output bench_results.json
+
+For every script and size this records the time of each phase, the peak
+traced memory of a separate run and the size of the saved HTML. For v3
+the phases are the builder's own stages as reported by itsmf_instrument
+(sort_events, base_map, markers, logo, event_list, panels), followed by
+render and write. v1 and
+v2 define their chapters inside create_itsmf_apac_map, so they can only
+be measured at their built-in size (recorded as `rows` = None).
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from itsmf_data import synthetic_chapters, synthetic_events  # noqa: E402
+from itsmf_dates import sort_events  # noqa: E402
+from itsmf_instrument import Instrumentation  # noqa: E402
+
+SCRIPTS = ('v1', 'v2', 'v3', 'v3-stream')
+MODULES = {
+    'v1': 'itsmf_chapter_apac_Vv1',
+    'v2': 'itsmf_chapter_apac_v2',
+    'v3': 'itsmf_chapter_apac_v3',
+}
+DEFAULT_SIZES = (10, 1000, 10000, 100000)
+
+
+def _timed(phases, name, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    phases[name] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def run_fixed(module, output_file):
+    """v1/v2: the data is built into the function, so only build/render/write are timed."""
+    phases = {}
+    m = _timed(phases, 'build_map', module.create_itsmf_apac_map)
+    html = _timed(phases, 'render', m.get_root().render)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        _timed(phases, 'write', f.write, html)
+    return phases
+
+
+def run_v3(module, chapters, events, output_file, render_mode):
+    """v3: each stage of create_itsmf_apac_map, then render/write."""
+    # Memory is measured by a separate traced run, so the stages only time
+    instrument = Instrumentation(memory=False)
+    m = module.create_itsmf_apac_map(chapters, events, render_mode=render_mode, instrument=instrument)
+    phases = {stage['stage']: stage['wall_seconds'] for stage in instrument.report()['stages']}
+    html = _timed(phases, 'render', m.get_root().render)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        _timed(phases, 'write', f.write, html)
+    return phases
+
+
+def run_v3_stream(chapters, events, output_file):
+    import itsmf_stream
+
+    phases = {}
+    events_sorted = _timed(phases, 'sort_events', sort_events, events)
+    _timed(phases, 'stream_write', itsmf_stream.write_map, output_file, chapters, events_sorted)
+    return phases
+
+
+def run_case(script, chapters, events, output_file, render_mode):
+    if script == 'v3-stream':
+        return run_v3_stream(chapters, events, output_file)
+    module = importlib.import_module(MODULES[script])
+    if script == 'v3':
+        return run_v3(module, chapters, events, output_file, render_mode)
+    return run_fixed(module, output_file)
+
+
+def measure(script, rows, render_mode, out_dir):
+    output_file = os.path.join(out_dir, f"{script}-{rows}.html")
+    # Generated up front so neither the timings nor the peak memory include it
+    chapters = list(synthetic_chapters(rows or 0))
+    events = list(synthetic_events(rows or 0))
+
+    # Timing and memory come from separate runs: tracemalloc slows
+    # allocation-heavy code down several times
+    phases = run_case(script, chapters, events, output_file, render_mode)
+    html_bytes = os.path.getsize(output_file)
+
+    tracemalloc.start()
+    run_case(script, chapters, events, output_file, render_mode)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'script': script,
+        'rows': None if script in ('v1', 'v2') else rows,
+        'render_mode': render_mode if script == 'v3' else None,
+        'phases': phases,
+        'total_seconds': round(sum(phases.values()), 6),
+        'peak_memory_bytes': peak,
+        'html_bytes': html_bytes,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scripts', nargs='+', choices=SCRIPTS, default=list(SCRIPTS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument('--render-mode', default='auto', help='v3 marker render mode')
+    parser.add_argument('--output', default='bench_results.json', help='results JSON file')
+    args = parser.parse_args(argv)
+
+    # Work in a scratch directory so the generated pages stay out of the repo
+    os.chdir(tempfile.mkdtemp(prefix='itsmf-bench-'))
+    out_dir = os.getcwd()
+    output = args.output if os.path.isabs(args.output) else os.path.join(ROOT, args.output)
+
+    results = []
+    for script in args.scripts:
+        sizes = [None] if script in ('v1', 'v2') else args.sizes
+        for rows in sizes:
+            result = measure(script, rows, args.render_mode, out_dir)
+            results.append(result)
+            label = 'built-in' if result['rows'] is None else result['rows']
+            print(f"{script:<10} {label!s:>8} rows  {result['total_seconds']:>9.3f}s  "
+                  f"peak {result['peak_memory_bytes'] / 1e6:>9.1f} MB  html {result['html_bytes'] / 1e6:>8.2f} MB",
+                  flush=True)
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to '{output}'")
+
+
+if __name__ == "__main__":
+    main()
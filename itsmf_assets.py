@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+
+from itsmf_data import AtomicFile
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it the logo is used as-is
+    Image = None
+
+ASSET_CACHE_DIR = os.path.join('.itsmf_cache', 'assets')
+INDEX_FILE = 'index.json'
+
+# The logo box in the page is 240x80 CSS pixels; render at 2x for HiDPI screens
+LOGO_BOX = (240, 80)
+LOGO_SCALE = 2
+
+LOGO_MODES = ('inline', 'file')
+
+_EXTENSIONS = {'image/png': '.png', 'image/jpeg': '.jpg', 'image/gif': '.gif', 'image/webp': '.webp'}
+
+
+class LogoAsset:
+    """An optimised logo image held in the asset cache."""
+    __slots__ = ('path', 'sha256', 'mime', 'width', 'height')
+
+    def __init__(self, path, sha256, mime, width, height):
+        self.path = path
+        self.sha256 = sha256
+        self.mime = mime
+        self.width = width
+        self.height = height
+
+    @property
+    def filename(self):
+        """Content-hashed file name, safe to serve with a far-future cache header."""
+        ext = _EXTENSIONS.get(self.mime, '.img')
+        return f"itsmf-logo.{self.sha256[:12]}{ext}"
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def data_uri(self):
+        return f"data:{self.mime};base64,{base64.b64encode(self.read()).decode()}"
+
+
+# In-process cache, keyed like the on-disk index
+_memo = {}
+
+
+def _load_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_index(cache_dir, index):
+    path = os.path.join(cache_dir, INDEX_FILE)
+    with AtomicFile(path) as f:
+        json.dump(index, f, indent=2)
+
+
+def _sniff_mime(raw):
+    if raw.startswith(b'\x89PNG'):
+        return 'image/png'
+    if raw.startswith(b'\xff\xd8'):
+        return 'image/jpeg'
+    if raw.startswith(b'GIF8'):
+        return 'image/gif'
+    if raw[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def _optimise(raw, box):
+    """Resize `raw` image bytes to fit `box` and recompress; returns (bytes, mime, w, h)."""
+    if Image is None:
+        return raw, _sniff_mime(raw), None, None
+    with Image.open(io.BytesIO(raw)) as img:
+        img.load()
+        original_mime = Image.MIME.get(img.format, _sniff_mime(raw))
+        original_size = img.size
+        img.thumbnail(box, Image.LANCZOS)
+        out = io.BytesIO()
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img.save(out, format='PNG', optimize=True)
+            mime = 'image/png'
+        else:
+            img.convert('RGB').save(out, format='JPEG', quality=85, optimize=True, progressive=True)
+            mime = 'image/jpeg'
+        data = out.getvalue()
+        size = img.size
+
+    # Keep an already small image if recompressing would not shrink it
+    if size == original_size and len(data) >= len(raw):
+        return raw, original_mime, size[0], size[1]
+    return data, mime, size[0], size[1]
+
+
+def prepare_logo(source, box=None, cache_dir=ASSET_CACHE_DIR):
+    """
+    Return the optimised LogoAsset for the image at `source`, or None if missing.
+
+    The result is cached by the source's mtime and size (no read at all on
+    a hit) and, when those change, by the sha256 of its bytes, so touching
+    the file without editing it does not re-encode the image. Without
+    Pillow the original bytes are cached unchanged.
+    """
+    if box is None:
+        box = (LOGO_BOX[0] * LOGO_SCALE, LOGO_BOX[1] * LOGO_SCALE)
+    try:
+        st = os.stat(source)
+    except FileNotFoundError:
+        return None
+
+    stat_key = f"{os.path.abspath(source)}:{st.st_mtime_ns}:{st.st_size}:{box[0]}x{box[1]}"
+    asset = _memo.get(stat_key)
+    if asset is not None and os.path.exists(asset.path):
+        return asset
+
+    os.makedirs(cache_dir, exist_ok=True)
+    index = _load_index(cache_dir)
+    entry = index.get(stat_key)
+
+    if entry is None or not os.path.exists(os.path.join(cache_dir, entry['file'])):
+        with open(source, 'rb') as f:
+            raw = f.read()
+        content_key = f"{hashlib.sha256(raw).hexdigest()}:{box[0]}x{box[1]}"
+        entry = index.get(content_key)
+        if entry is None or not os.path.exists(os.path.join(cache_dir, entry['file'])):
+            data, mime, width, height = _optimise(raw, box)
+            sha = hashlib.sha256(data).hexdigest()
+            entry = {'file': sha, 'sha256': sha, 'mime': mime, 'width': width, 'height': height}
+            with open(os.path.join(cache_dir, sha), 'wb') as f:
+                f.write(data)
+            index[content_key] = entry
+        index[stat_key] = entry
+        _save_index(cache_dir, index)
+
+    asset = LogoAsset(os.path.join(cache_dir, entry['file']), entry['sha256'],
+                      entry['mime'], entry['width'], entry['height'])
+    _memo[stat_key] = asset
+    return asset
+
+
+def logo_src(asset, mode='inline', asset_dir='assets', out_dir='.'):
+    """
+    Return the <img src> for `asset`.
+
+    'inline' embeds a data URI. 'file' copies the image into `asset_dir`
+    under `out_dir` (the directory of the page) under its content-hashed
+    name (once) and returns the URL of that file relative to the page, so
+    browsers can cache it across page loads.
+    """
+    if mode not in LOGO_MODES:
+        raise ValueError(f"Unknown logo mode: {mode!r}")
+    if mode == 'inline':
+        return asset.data_uri()
+
+    directory = os.path.join(out_dir, asset_dir)
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, asset.filename)
+    if not os.path.exists(target):
+        shutil.copyfile(asset.path, target)
+    return f"{asset_dir.replace(os.sep, '/').rstrip('/')}/{asset.filename}"
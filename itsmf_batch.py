@@ -0,0 +1,160 @@
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from itsmf_data import CHAPTERS_FILE, EVENTS_FILE, iter_chapters
+from itsmf_event_index import EventIndex, load_event_index
+
+# APAC sub-regions used by the region filter
+REGION_COUNTRIES = {
+    'south-asia': ['India'],
+    'southeast-asia': ['Malaysia', 'Thailand'],
+    'east-asia': ['Hong Kong'],
+    'oceania': ['Australia', 'New Zealand'],
+}
+
+# One map to render. `region` is a REGION_COUNTRIES key, `countries` a list
+# of country names (both None = all), `date_window` a (start, end) pair of
+# dates with end exclusive (None = all events), `language` a LABELS key.
+Variant = namedtuple('Variant', ['name', 'region', 'countries', 'date_window', 'language'])
+Variant.__new__.__defaults__ = (None, None, None, 'en')
+
+REPORT_FILE = 'batch_report.json'
+
+
+def variant_from_dict(spec):
+    """Build a Variant from a JSON object, parsing ISO dates in `date_window`."""
+    window = spec.get('date_window')
+    if window is not None:
+        window = tuple(date.fromisoformat(d) if isinstance(d, str) else d for d in window)
+    return Variant(spec['name'], spec.get('region'), spec.get('countries'),
+                   window, spec.get('language', 'en'))
+
+
+def default_variants(chapters, today=None, windows=(30, 90, 365), languages=('en', 'th')):
+    """The published set: APAC, one map per region, country, language and upcoming window."""
+    today = today or date.today()
+    variants = [Variant('apac')]
+    for region in REGION_COUNTRIES:
+        variants.append(Variant(f"region-{region}", region=region))
+    for country in sorted({chapter['country'] for chapter in chapters}):
+        slug = country.lower().replace(' ', '-')
+        variants.append(Variant(f"country-{slug}", countries=[country]))
+    for language in languages:
+        if language != 'en':
+            variants.append(Variant(f"lang-{language}", language=language))
+    for days in windows:
+        variants.append(Variant(f"upcoming-{days}d", date_window=(today, today + timedelta(days=days))))
+    return variants
+
+
+def select(variant, chapters, events):
+    """Return the chapters list and SortedEvents (from EventIndex `events`) that `variant` shows."""
+    countries = None
+    if variant.region is not None or variant.countries is not None:
+        countries = set(variant.countries or ())
+        if variant.region is not None:
+            countries.update(REGION_COUNTRIES[variant.region])
+
+    if countries is not None:
+        chapters = [chapter for chapter in chapters if chapter['country'] in countries]
+    start, end = variant.date_window or (None, None)
+    return chapters, events.query(start, end, countries)
+
+
+# Inputs shared by every task in a worker process, set once by _init_worker
+_shared = {}
+
+
+def _init_worker(chapters, events):
+    _shared['chapters'] = chapters
+    _shared['events'] = events
+
+
+def _render_variant(variant, out_dir, map_options):
+    import itsmf_chapter_apac_v3 as builder
+
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    chapters, events = select(variant, _shared['chapters'], _shared['events'])
+    m = builder.create_itsmf_apac_map(chapters, events, language=variant.language, out_dir=out_dir,
+                                      **map_options)
+    output_file = os.path.join(out_dir, f"{variant.name}.html")
+    m.save(output_file)
+    return {
+        'name': variant.name,
+        'output': output_file,
+        'chapters': len(chapters),
+        'events': len(events),
+        'wall_seconds': round(time.perf_counter() - start_wall, 4),
+        'cpu_seconds': round(time.process_time() - start_cpu, 4),
+    }
+
+
+def render_variants(variants, out_dir, chapters=None, events=None, workers=None, **map_options):
+    """
+    Render every variant to `out_dir`/<name>.html across a process pool.
+
+    Chapters and events are loaded and indexed once in the parent and
+    handed to each worker once through the pool initializer (inherited
+    without copying where the platform forks), so tasks only send the
+    small Variant; without `events`, the persisted index of the events
+    file is loaded (see itsmf_event_index.load_event_index). Returns one
+    timing record per variant, in input order, and writes them to
+    `out_dir`/batch_report.json.
+    """
+    chapters = list(iter_chapters(CHAPTERS_FILE) if chapters is None else chapters)
+    if events is None:
+        events = load_event_index(EVENTS_FILE)
+    elif not isinstance(events, EventIndex):
+        events = EventIndex.build(events)
+    os.makedirs(out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(chapters, events)) as pool:
+        futures = {pool.submit(_render_variant, variant, out_dir, map_options): i
+                   for i, variant in enumerate(variants)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    report = {
+        'workers': workers or os.cpu_count(),
+        'total_wall_seconds': round(time.perf_counter() - start, 4),
+        'variants': [results[i] for i in range(len(variants))],
+    }
+    with open(os.path.join(out_dir, REPORT_FILE), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Render many ITSMF map variants in parallel')
+    parser.add_argument('--variants', help='JSON file with a list of variant objects (default: published set)')
+    parser.add_argument('--chapters', default=CHAPTERS_FILE, help='chapters CSV/JSONL file')
+    parser.add_argument('--events', default=EVENTS_FILE, help='events CSV/JSONL file')
+    parser.add_argument('--out-dir', default='maps', help='output directory')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--render-mode', default='auto', help='marker render mode')
+    args = parser.parse_args()
+
+    chapters = list(iter_chapters(args.chapters))
+    if args.variants:
+        with open(args.variants, encoding='utf-8') as f:
+            variants = [variant_from_dict(spec) for spec in json.load(f)]
+    else:
+        variants = default_variants(chapters)
+
+    report = render_variants(variants, args.out_dir, chapters, load_event_index(args.events),
+                             workers=args.workers, render_mode=args.render_mode)
+    for result in report['variants']:
+        print(f"{result['name']:<28} {result['wall_seconds']:>8.3f}s  "
+              f"{result['chapters']:>6} chapters  {result['events']:>7} events")
+    print(f"\n{len(variants)} variants rendered in {report['total_wall_seconds']:.3f}s "
+          f"with {report['workers']} workers; report in '{os.path.join(args.out_dir, REPORT_FILE)}'")
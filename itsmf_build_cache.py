@@ -0,0 +1,264 @@
+import hashlib
+import importlib.util
+import json
+import os
+from datetime import date
+
+import itsmf_chapter_apac_v3 as builder
+from itsmf_data import CHAPTERS_FILE, EVENTS_FILE, file_key, iter_chapters, write_atomic
+from itsmf_dates import sort_events
+from itsmf_event_index import EventIndex, load_event_index
+from itsmf_geocode import GAZETTEER_FILE
+from itsmf_instrument import NULL_INSTRUMENTATION
+from itsmf_publish import PRECOMPRESSED_SUFFIXES, minify_html, precompress, remove_precompressed
+
+CACHE_DIR = '.itsmf_cache'
+MANIFEST_FILE = 'build.json'
+SHELL_FILE = 'shell.html'
+
+# Modules whose code ends up in the page: markup, CSS, scripts and their inputs
+PAGE_MODULES = (
+    'itsmf_chapter_apac_v3', 'itsmf_templates', 'itsmf_layers', 'itsmf_event_list',
+    'itsmf_columns', 'itsmf_data', 'itsmf_dates', 'itsmf_event_index', 'itsmf_spatial',
+    'itsmf_regions', 'itsmf_tiles', 'itsmf_assets', 'itsmf_vendor', 'itsmf_publish',
+    'itsmf_geocode', 'itsmf_build_cache',
+)
+
+# Stands in for the event cards in the cached page shell
+EVENT_LIST_PLACEHOLDER = '<!-- itsmf:event-list -->'
+
+
+def _hash_records(records, digest=None):
+    """Feed records into a sha256 digest one canonical JSON line at a time."""
+    digest = digest or hashlib.sha256()
+    for record in records:
+        digest.update(json.dumps(record, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(b'\n')
+    return digest
+
+
+def _hash_source(records, source_key, digest):
+    """Feed a file identity into `digest` if there is one, else the records themselves."""
+    if source_key is not None:
+        digest.update(json.dumps(source_key).encode('utf-8'))
+        return digest
+    return _hash_records(records, digest)
+
+
+def chapters_source_key(path):
+    """
+    File identity of a chapters file, and of the gazetteer its blank
+    coordinates are geocoded from (see itsmf_data.iter_chapters).
+    """
+    try:
+        gazetteer = file_key(GAZETTEER_FILE)
+    except FileNotFoundError:
+        gazetteer = None
+    return [file_key(path), gazetteer]
+
+
+def _file_bytes(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return b''
+
+
+def script_version():
+    """Hash of the source of every module in PAGE_MODULES, so code changes invalidate the cache."""
+    import folium
+
+    digest = hashlib.sha256(folium.__version__.encode())
+    for name in PAGE_MODULES:
+        spec = importlib.util.find_spec(name)
+        digest.update(name.encode())
+        digest.update(hashlib.sha256(_file_bytes(spec.origin)).digest())
+    return digest.hexdigest()
+
+
+def shell_key(chapters, country_colors, logo_file, map_options, source_key=None):
+    """
+    Content hash of everything except the events.
+
+    The chapters count by their file's `source_key` when they were read
+    from a file, and by their records otherwise.
+    """
+    digest = hashlib.sha256()
+    digest.update(script_version().encode())
+    digest.update(json.dumps(country_colors, sort_keys=True).encode())
+    digest.update(json.dumps(map_options, sort_keys=True, default=str).encode())
+    digest.update(hashlib.sha256(_file_bytes(logo_file)).digest())
+    return _hash_source(chapters, source_key, digest).hexdigest()
+
+
+def events_key(events, today=None, source_key=None):
+    """Hash of the events (as for shell_key) and the day an upcoming-events window starts on."""
+    digest = hashlib.sha256(str(today).encode())
+    return _hash_source(events, source_key, digest).hexdigest()
+
+
+def _precompressed_state(path):
+    """sha256 of each .gz/.br sibling of `path`, or None where there is none."""
+    state = {}
+    for suffix in PRECOMPRESSED_SUFFIXES:
+        try:
+            with open(path + suffix, 'rb') as f:
+                state[suffix] = hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            state[suffix] = None
+    return state
+
+
+def _load_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def build_map_html(output_file, chapters=None, events=None, country_colors=None,
+                   cache_dir=CACHE_DIR, force=False, vendor=False, inline_critical=False,
+                   publish=False, instrument=None, **map_options):
+    """
+    Write the map to `output_file`, re-rendering only what changed.
+
+    Returns one of:
+      'unchanged' - inputs match the last build and the output and its
+                    .gz/.br siblings are intact; nothing was rendered or
+                    written
+      'events'    - only the events changed; the cached page shell (markers,
+                    legend, info panel, title) was reused and only the event
+                    list was re-rendered
+      'full'      - the whole folium map was rendered
+
+    With `vendor`, the CDN scripts and stylesheets are served from a
+    local vendor/ directory next to the output (see itsmf_vendor), with
+    the critical CSS inlined if `inline_critical` is also set.
+
+    With `publish`, the page is minified and .gz/.br siblings are written
+    next to it (see itsmf_publish); without it, siblings left by an
+    earlier published build are deleted so they cannot be served in
+    place of the new page.
+
+    `instrument` (an itsmf_instrument.Instrumentation) times the build
+    stages, including create_itsmf_apac_map's own, and is not part of
+    the cache key.
+
+    `chapters` may be the path of a chapters file (by default
+    CHAPTERS_FILE) and `events` an itsmf_event_index.EventIndex (by
+    default the persisted index of the events file). Inputs from files
+    are keyed by the files' path, mtime and size, so a build with
+    unchanged files reads no records at all; in-memory records are
+    hashed instead.
+
+    Extra keyword arguments are passed to create_itsmf_apac_map and are
+    part of the cache key.
+    """
+    if chapters is None:
+        chapters = CHAPTERS_FILE
+    if events is None:
+        events = load_event_index(EVENTS_FILE)
+    if country_colors is None:
+        country_colors = builder.COUNTRY_COLORS
+    if instrument is None:
+        instrument = NULL_INSTRUMENTATION
+    # An upcoming-events window moves with the date, so it is part of the events key
+    today = None
+    if map_options.get('upcoming_days') is not None:
+        today = map_options.get('today') or date.today()
+
+    # Logo files and vendored assets are written next to the page, so the
+    # shell is only reused for pages in the same directory
+    output_path = os.path.abspath(output_file)
+    out_dir = os.path.dirname(output_path)
+
+    # In-memory inputs are hashed before rendering, so they are materialised once;
+    # a chapters file is only read if the shell has to be rendered
+    with instrument.stage('hash_inputs'):
+        chapters_key = events_source_key = None
+        if isinstance(chapters, (str, os.PathLike)):
+            chapters_key = chapters_source_key(chapters)
+            chapters = iter_chapters(chapters)
+        else:
+            chapters = list(chapters)
+        if isinstance(events, EventIndex):
+            events_source_key = events.source_key
+        else:
+            events = list(events)
+        key_options = dict(map_options, vendor=vendor, inline_critical=inline_critical, publish=publish,
+                           out_dir=out_dir)
+        new_shell_key = shell_key(chapters, country_colors, builder.LOGO_FILE, key_options, chapters_key)
+        new_events_key = events_key(events.events if isinstance(events, EventIndex) else events, today,
+                                    events_source_key)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = _load_manifest(cache_dir)
+    shell_path = os.path.join(cache_dir, SHELL_FILE)
+
+    output_intact = (
+        os.path.exists(output_path)
+        and manifest.get('output') == output_path
+        and manifest.get('output_sha256') == hashlib.sha256(_file_bytes(output_path)).hexdigest()
+        and manifest.get('precompressed') == _precompressed_state(output_path)
+    )
+    if (not force and output_intact
+            and manifest.get('shell_key') == new_shell_key
+            and manifest.get('events_key') == new_events_key):
+        return 'unchanged'
+
+    if not force and manifest.get('shell_key') == new_shell_key and os.path.exists(shell_path):
+        status = 'events'
+        with open(shell_path, encoding='utf-8', newline='') as f:
+            shell = f.read()
+    else:
+        status = 'full'
+        with instrument.stage('build_map'):
+            m = builder.create_itsmf_apac_map(
+                chapters, country_colors=country_colors, event_list_html=EVENT_LIST_PLACEHOLDER,
+                out_dir=out_dir, instrument=instrument, **map_options
+            )
+        if vendor:
+            from itsmf_vendor import vendor_assets
+
+            with instrument.stage('vendor'):
+                vendor_assets(m, out_dir=out_dir, inline_critical=inline_critical)
+        with instrument.stage('render'):
+            shell = m.get_root().render()
+            write_atomic(shell_path, shell)
+
+    with instrument.stage('event_list'):
+        labels = builder.LABELS[map_options.get('language', 'en')]
+        if not isinstance(events, EventIndex):
+            events = sort_events(events)
+        selected = builder.select_events(
+            events, map_options.get('upcoming_days'),
+            map_options.get('event_countries'), today
+        )
+        event_list_html = builder.render_event_list(
+            selected, country_colors, labels,
+            map_options.get('event_list', 'cards'),
+            map_options.get('event_page_size', builder.EVENT_PAGE_SIZE)
+        )
+        html = shell.replace(EVENT_LIST_PLACEHOLDER, event_list_html, 1)
+    if publish:
+        with instrument.stage('minify'):
+            html = minify_html(html)
+    with instrument.stage('write'):
+        write_atomic(output_path, html)
+    if publish:
+        with instrument.stage('precompress'):
+            precompress(output_path)
+    else:
+        remove_precompressed(output_path)
+
+    manifest = {
+        'output': output_path,
+        'output_sha256': hashlib.sha256(html.encode('utf-8')).hexdigest(),
+        'shell_key': new_shell_key,
+        'events_key': new_events_key,
+        'precompressed': _precompressed_state(output_path),
+    }
+    write_atomic(os.path.join(cache_dir, MANIFEST_FILE), json.dumps(manifest, indent=2))
+    return status
@@ -1,294 +1,440 @@
 import folium
 from folium import plugins
-import base64
 import os
-from datetime import datetime
-
-# Define itsmf_chapters globally
-itsmf_chapters = [
-    {
-        'country': 'India',
-        'city': 'Bangalore',
-        'lat': 12.9716,
-        'lon': 77.5946,
-        'chapter': 'ITSMF India',
-        'details': 'Silicon Valley of India',
-        'website': 'https://itsmfindiachapter.com/'
-    },
-    {
-        'country': 'Malaysia',
-        'city': 'Kuala Lumpur',
-        'lat': 3.1390,
-        'lon': 101.6869,
-        'chapter': 'ITSMF Malaysia',
-        'details': 'National chapter headquarters',
-        'website': 'https://itsmf.org.my/'
-    },
-    {
-        'country': 'Thailand',
-        'city': 'Bangkok',
-        'lat': 13.7563,
-        'lon': 100.5018,
-        'chapter': 'ITSMF Thailand',
-        'details': 'Central hub for SE Asia ITSM activities',
-        'website': 'https://www.linkedin.com/company/itsmf-thailand-chapter/'
-    },
-    {
-        'country': 'Hong Kong',
-        'city': 'Hong Kong',
-        'lat': 22.3193,
-        'lon': 114.1694,
-        'chapter': 'ITSMF Hong Kong',
-        'details': 'Financial services ITSM focus',
-        'website': 'http://www.itsmf.org.hk/eng/'
-    },
-    {
-        'country': 'Australia',
-        'city': 'Melbourne',
-        'lat': -37.8136,
-        'lon': 144.9631,
-        'chapter': 'ITSMF Australia',
-        'details': 'Strong enterprise ITSM community',
-        'website': 'https://itsmfaus.site-ym.com/'
-    },
-    {
-        'country': 'New Zealand',
-        'city': 'Auckland',
-        'lat': -36.8485,
-        'lon': 174.7633,
-        'chapter': 'ITSMF New Zealand',
-        'details': 'National chapter covering both islands',
-        'website': 'http://itsmf.org.nz/'
-    }
-]
-
-# Define event data structure
-itsmf_events = [
-    {
-        'country': 'Thailand',
-        'date': '09 October 2025',
-        'title': 'Webinar: ITSMF Thailand / ITSM and Business Continuity',
-        'link': 'https://www.linkedin.com/events/7368878092259426305'
+from datetime import date, datetime, timedelta
+from html import escape
+from itertools import chain, islice
+
+from itsmf_assets import logo_src, prepare_logo
+from itsmf_columns import ChapterColumns, EventColumns, colors_for, event_columns
+from itsmf_data import CHAPTERS_FILE, COUNTRY_COLORS, EVENTS_FILE, iter_chapters, iter_events
+from itsmf_dates import SortedEvents, event_date_ordinal, sort_events
+from itsmf_event_index import EventIndex
+from itsmf_event_list import EVENT_PAGE_SIZE, iter_virtual_event_list
+from itsmf_instrument import NULL_INSTRUMENTATION
+from itsmf_layers import ChapterGeoJson, NearestChapterLookup
+from itsmf_regions import DEFAULT_REGION, get_region
+from itsmf_spatial import ChapterIndex
+from itsmf_tiles import OSM_ATTRIBUTION
+from itsmf_templates import (EVENT_CARD_TEMPLATE, FRAGMENT_CSS, LEGEND_ROW_TEMPLATE, POPUP_TEMPLATE,
+                             fragment_template)
+
+def parse_date(date_str):
+    """Parse date string into datetime object for sorting."""
+    return datetime.fromordinal(event_date_ordinal(date_str))
+
+LOGO_FILE = 'itsmf-logo.png'
+
+# Page text per language
+LABELS = {
+    'en': {
+        'legend_title': 'ITSMF APAC Chapters',
+        'events_title': 'Upcoming Events 🗓️',
+        'about_title': 'About ITSMF APAC',
+        'about_org': '<strong>IT Service Management Forum (ITSMF)</strong> is a global organization '
+                     'promoting best practices in IT Service Management across the Asia-Pacific region.',
+        'about_chapters': 'These chapters provide local networking, training, and certification opportunities '
+                          'for ITSM professionals.',
+        'about_hint': 'Click on markers for chapter details and website links',
+        'map_title': 'ITSMF Asia-Pacific Chapter Locations',
+        'location': 'Location',
+        'details': 'Details',
+        'website': 'Website',
+        'more_info': 'More info',
+        'nearest_chapter': 'Nearest chapter',
+        'legend_chapters': 'chapters',
     },
-    {
-        'country': 'Australia',
-        'date': 'Thursday, 11 September 2025',
-        'title': 'National Monthly Event - 11th Sept 2025 - SIAM Bodies of Knowledge',
-        'link': 'https://itsmfaus.site-ym.com/events/EventDetails.aspx?id=1982781'
+    'th': {
+        'legend_title': 'สาขา ITSMF เอเชียแปซิฟิก',
+        'events_title': 'กิจกรรมที่กำลังจะมาถึง 🗓️',
+        'about_title': 'เกี่ยวกับ ITSMF APAC',
+        'about_org': '<strong>IT Service Management Forum (ITSMF)</strong> เป็นองค์กรระดับโลก'
+                     'ที่ส่งเสริมแนวปฏิบัติที่ดีด้านการบริหารจัดการบริการไอทีทั่วภูมิภาคเอเชียแปซิฟิก',
+        'about_chapters': 'สาขาเหล่านี้เป็นเครือข่ายท้องถิ่นที่ให้บริการการฝึกอบรมและการรับรอง'
+                          'สำหรับผู้เชี่ยวชาญด้าน ITSM',
+        'about_hint': 'คลิกที่หมุดเพื่อดูรายละเอียดและเว็บไซต์ของแต่ละสาขา',
+        'map_title': 'ที่ตั้งสาขา ITSMF ในเอเชียแปซิฟิก',
+        'location': 'ที่ตั้ง',
+        'details': 'รายละเอียด',
+        'website': 'เว็บไซต์',
+        'more_info': 'ข้อมูลเพิ่มเติม',
+        'nearest_chapter': 'สาขาที่ใกล้ที่สุด',
+        'legend_chapters': 'สาขา',
     },
-    {
-        'country': 'Australia',
-        'date': 'Thursday, 25 September 2025',
-        'title': 'ACT F2F Event - 25th Sept 2025 - AI-Driven ITSM: Live Demo. Real-Use Cases. Real Outcomes.',
-        'link': 'https://itsmfaus.site-ym.com/events/EventDetails.aspx?id=1983729'
+}
+
+# Event list modes; 'virtual' only creates DOM for the visible rows
+EVENT_LIST_MODES = ('cards', 'virtual')
+
+# Marker render modes; 'auto' switches to 'fast_cluster' above the threshold
+RENDER_MODES = ('auto', 'markers', 'cluster', 'fast_cluster', 'geojson')
+CLUSTER_THRESHOLD = 1000
+
+# Client-side marker factory for FastMarkerCluster.
+# Each row is [lat, lon, color, chapter, city, country, details, website];
+# __LOCATION__ etc. are replaced with the page labels.
+FAST_CLUSTER_CALLBACK = """
+    function (row) {
+        function esc(s) {
+            return String(s).replace(/[&<>"']/g, function (c) {
+                return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+            });
+        }
+        var icon = L.AwesomeMarkers.icon({icon: 'info-sign', prefix: 'fa', markerColor: row[2]});
+        var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+        marker.bindTooltip(esc(row[3] + ' - ' + row[4]));
+        marker.bindPopup(
+            '<div class="itsmf-popup"><h4>' + esc(row[3]) + '</h4>' +
+            '<p><strong>__LOCATION__:</strong> ' + esc(row[4]) + ', ' + esc(row[5]) + '</p>' +
+            '<p><strong>__DETAILS__:</strong> ' + esc(row[6]) + '</p>' +
+            '<p><strong>__WEBSITE__:</strong> <a href="' + esc(row[7]) + '" target="_blank">' + esc(row[7]) + '</a></p></div>',
+            {maxWidth: 280}
+        );
+        return marker;
     }
-]
+"""
 
-def parse_date(date_str):
-    """Parse date string into datetime object for sorting."""
-    # Remove day name if present (e.g., 'Thursday, ')
-    date_str = ' '.join(date_str.split(',')[1:]).strip() if ',' in date_str else date_str
-    return datetime.strptime(date_str, '%d %B %Y')
+def resolve_render_mode(chapters, render_mode='auto', cluster_threshold=CLUSTER_THRESHOLD):
+    """
+    Pick the marker render mode for `chapters`.
 
-def create_itsmf_apac_map():
+    Returns (mode, chapters). For 'auto', at most `cluster_threshold` + 1
+    chapters are buffered to decide, and the returned iterable still yields
+    every chapter exactly once.
+    """
+    if render_mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode: {render_mode!r}")
+    if render_mode != 'auto':
+        return render_mode, chapters
+
+    chapters = iter(chapters)
+    head = list(islice(chapters, cluster_threshold + 1))
+    mode = 'fast_cluster' if len(head) > cluster_threshold else 'markers'
+    return mode, chain(head, chapters)
+
+def fast_cluster_callback(labels):
+    """Return FAST_CLUSTER_CALLBACK with the popup labels filled in."""
+    return (FAST_CLUSTER_CALLBACK
+            .replace('__LOCATION__', labels['location'])
+            .replace('__DETAILS__', labels['details'])
+            .replace('__WEBSITE__', labels['website']))
+
+def iter_event_items(events, country_colors=COUNTRY_COLORS, labels=LABELS['en']):
+    """Yield the event card HTML for each event, in the order given."""
+    events = event_columns(events)
+    yield from fragment_template(EVENT_CARD_TEMPLATE, labels).render_columns(
+        events, colors_for(events.country, country_colors))
+
+def iter_event_list(events, country_colors=COUNTRY_COLORS, labels=LABELS['en'],
+                    event_list='cards', event_page_size=EVENT_PAGE_SIZE):
+    """
+    Yield the event list HTML for the legend panel in chunks.
+
+    `event_list` is one of EVENT_LIST_MODES: 'cards' renders one HTML
+    card per event, 'virtual' emits a JSON payload with a virtual-scroll
+    renderer that keeps `event_page_size` rows per page in the DOM.
+    """
+    if event_list not in EVENT_LIST_MODES:
+        raise ValueError(f"Unknown event list mode: {event_list!r}")
+    if event_list == 'virtual':
+        return iter_virtual_event_list(events, country_colors, labels, page_size=event_page_size)
+    return iter_event_items(events, country_colors, labels)
+
+def render_event_list(events, country_colors=COUNTRY_COLORS, labels=LABELS['en'],
+                      event_list='cards', event_page_size=EVENT_PAGE_SIZE):
+    """Render the event list for the legend panel, in the order given."""
+    return ''.join(iter_event_list(events, country_colors, labels, event_list, event_page_size))
+
+def select_events(events, upcoming_days=None, countries=None, today=None):
+    """Narrow SortedEvents or an EventIndex to a window of upcoming days and/or countries."""
+    start = end = None
+    if upcoming_days is not None:
+        start = today or date.today()
+        end = start + timedelta(days=upcoming_days)
+    if isinstance(events, EventIndex):
+        return events.query(start, end, countries)
+    if start is not None:
+        events = events.between(start, end)
+    if countries is not None:
+        countries = set(countries)
+        events = events.filter(lambda event: event['country'] in countries)
+    return events
+
+def create_itsmf_apac_map(chapters=None, events=None, render_mode='auto',
+                          cluster_threshold=CLUSTER_THRESHOLD, country_colors=None,
+                          event_list_html=None, logo_mode=None, asset_dir='assets', out_dir='.',
+                          language='en', chapter_list_html=None, event_list='cards',
+                          event_page_size=EVENT_PAGE_SIZE, upcoming_days=None,
+                          event_countries=None, today=None, nearest_lookup=False,
+                          instrument=None, region=DEFAULT_REGION, tiles='OpenStreetMap',
+                          tiles_max_zoom=None):
     """
     Creates a map of APAC region showing ITSMF chapter locations
+
+    `chapters` and `events` can be any iterables of records (e.g. the
+    generators from itsmf_data); by default they are streamed from the
+    data files. Chapters are consumed in a single pass. `events` may also
+    be an already sorted itsmf_dates.SortedEvents or an
+    itsmf_event_index.EventIndex.
+
+    `render_mode` is one of RENDER_MODES: 'markers' adds one folium.Marker
+    per chapter, 'cluster' groups those markers in a MarkerCluster, and
+    'fast_cluster' ships the chapters as a plain array to a client-side
+    FastMarkerCluster. 'geojson' emits every chapter as one GeoJSON
+    FeatureCollection with shared client-side style and popup functions.
+    'auto' uses 'fast_cluster' when there are more than
+    `cluster_threshold` chapters and 'markers' otherwise.
+
+    `event_list_html` replaces the rendered event cards (the events are
+    then not read at all), and `chapter_list_html` the chapter rows of the
+    legend; itsmf_build_cache and itsmf_stream use them to render a page
+    shell with placeholders in place of those lists.
+
+    `logo_mode` adds the ITSMF logo: 'inline' embeds it as a data URI and
+    'file' writes it to `asset_dir` under `out_dir`, the directory the page
+    is saved in, and links to it. The default (None) leaves the logo out
+    without reading the image.
+
+    `language` selects the page text from LABELS.
+
+    `event_list` picks the event list rendering ('cards' or 'virtual',
+    see iter_event_list) and `event_page_size` its page size.
+
+    `upcoming_days` limits the events to the next N days from `today`
+    (default: the current date) and `event_countries` to those countries;
+    with an EventIndex both are answered by binary search.
+
+    `nearest_lookup` adds a map click handler that shows the nearest
+    chapter and its great-circle distance (see itsmf_spatial).
+
+    `instrument` is an itsmf_instrument.Instrumentation that times the
+    build stages (sort_events, base_map, markers, logo, event_list,
+    panels); by default nothing is measured.
+
+    `region` names the itsmf_regions.REGIONS entry (or is a Region) the
+    map opens on; itsmf_regions.write_sharded_map builds region-sharded
+    pages on top of this.
+
+    `tiles` is a folium tile set name or an OSM tile URL template, e.g.
+    the local tile server or exported tile files of itsmf_tiles; past
+    `tiles_max_zoom` the tiles of that zoom are scaled up.
     """
+    if chapters is None:
+        chapters = iter_chapters(CHAPTERS_FILE)
+    if events is None and event_list_html is None:
+        events = iter_events(EVENTS_FILE)
+    if country_colors is None:
+        country_colors = COUNTRY_COLORS
+    if instrument is None:
+        instrument = NULL_INSTRUMENTATION
+    labels = LABELS[language]
+    render_mode, chapters = resolve_render_mode(chapters, render_mode, cluster_threshold)
 
-    # Sort events by date
-    itsmf_events_sorted = sorted(itsmf_events, key=lambda e: parse_date(e['date']))
-
-    # Center coordinates for APAC region
-    center_lat = 15.0
-    center_lon = 120.0
-
-    # Create the base map
-    m = folium.Map(
-        location=[center_lat, center_lon],
-        zoom_start=3,
-        tiles='OpenStreetMap'
-    )
-
-    # Color scheme for different countries
-    country_colors = {
-        'India': 'orange',
-        'Malaysia': 'green',
-        'Thailand': 'red',
-        'Hong Kong': 'purple',
-        'Australia': 'blue',
-        'New Zealand': 'darkgreen'
-    }
+    # Sort events by date (parsed once per distinct date string);
+    # pre-sorted SortedEvents are used as-is
+    with instrument.stage('sort_events'):
+        if event_list_html is not None:
+            itsmf_events_sorted = events
+        else:
+            if not isinstance(events, (SortedEvents, EventIndex)):
+                events = sort_events(EventColumns.from_records(events))
+            itsmf_events_sorted = select_events(events, upcoming_days, event_countries, today)
 
-    # Add markers for each ITSMF chapter
-    for chapter in itsmf_chapters:
-        popup_content = f"""
-        <div style="width: 250px;">
-            <h4>{chapter['chapter']}</h4>
-            <p><strong>Location:</strong> {chapter['city']}, {chapter['country']}</p>
-            <p><strong>Details:</strong> {chapter['details']}</p>
-            <p><strong>Website:</strong> <a href="{chapter['website']}" target="_blank">{chapter['website']}</a></p>
-        </div>
-        """
-
-        folium.Marker(
-            [chapter['lat'], chapter['lon']],
-            popup=folium.Popup(popup_content, max_width=280),
-            tooltip=f"{chapter['chapter']} - {chapter['city']}",
-            icon=folium.Icon(
-                color=country_colors[chapter['country']],
-                icon='info-sign',
-                prefix='fa'
-            )
-        ).add_to(m)
-
-    # Add company logo placeholders
-    logo_html = '''
-    <div style="position: fixed;
-                top: 10px; left: 10px; width: 240px; height: 80px;
-                background-color: white; border: 2px solid #333;
-                z-index:9999; font-size:14px; text-align:center;
-                padding: 10px; border-radius: 5px; box-shadow: 0 2px 5px rgba(0,0,0,0.3);">
-        <strong>ITSMF APAC</strong>
-        <br><small>Chapter Locations</small>
-    </div>
-    '''
-
-    # Try to load actual logo if available
-    try:
-        with open('itsmf-logo.png', 'rb') as f:
-            logo_data = base64.b64encode(f.read()).decode()
-
-        logo_html = f'''
-        <div style="position: fixed;
-                    top: 10px; left: 10px; width: 240px; height: 80px;
-                    z-index:9999; background: white; border: 2px solid #333;
-                    border-radius: 5px; box-shadow: 0 2px 5px rgba(0,0,0,0.3);">
-            <img src="data:image/png;base64,{logo_data}"
-                 style="width: 100%; height: 100%; object-fit: contain;">
-        </div>
-        '''
-    except FileNotFoundError:
-        print("ITSMF logo file not found. Using placeholder.")
-
-    # Dynamically generate legend HTML using itsmf_chapters data
-    legend_items = []
-    for chapter in itsmf_chapters:
-        color = country_colors[chapter['country']]
-        legend_items.append(
-            f'''
-            <div style="margin: 5px 0;">
-                <span style="display: inline-block; width: 16px; height: 16px;
-                             background-color: {color}; margin-right: 8px; border-radius: 50%; vertical-align: middle;"></span>
-                <strong>{chapter['country']}:</strong> {chapter['city']} -
-                <a href="{chapter['website']}" target="_blank">{chapter['website']}</a>
-            </div>
-            '''
+    with instrument.stage('base_map'):
+        # Center coordinates for the region
+        region = get_region(region)
+        center_lat, center_lon = region.center
+
+        # Create the base map
+        m = folium.Map(
+            location=[center_lat, center_lon],
+            zoom_start=region.zoom,
+            tiles=None if '{z}' in tiles else tiles
         )
+        if '{z}' in tiles:
+            folium.TileLayer(tiles, attr=OSM_ATTRIBUTION, max_native_zoom=tiles_max_zoom,
+                             name='OpenStreetMap').add_to(m)
+        # Shared classes for the popups, legend rows and event cards
+        m.get_root().header.add_child(folium.Element(FRAGMENT_CSS), name='itsmf_fragments')
+
+    with instrument.stage('markers'):
+        # Markers go straight on the map, into a cluster layer, or into a plain
+        # array that the browser turns into clustered markers
+        marker_layer = m
+        if render_mode == 'cluster':
+            marker_layer = plugins.MarkerCluster(name='ITSMF Chapters').add_to(m)
+        elif render_mode == 'geojson':
+            geojson_layer = ChapterGeoJson(country_colors, labels).add_to(m)
+
+        # Read the chapters once into columns (interned countries, float
+        # coordinate arrays); the loops below zip columns instead of
+        # looking up fields in one dict per chapter
+        chapters = ChapterColumns.from_records(chapters)
+        colors = colors_for(chapters.country, country_colors)
+
+        if render_mode == 'fast_cluster':
+            plugins.FastMarkerCluster(
+                list(zip(chapters.lat, chapters.lon, colors, chapters.chapter, chapters.city,
+                         chapters.country, chapters.details, chapters.website)),
+                callback=fast_cluster_callback(labels),
+                name='ITSMF Chapters'
+            ).add_to(m)
+        elif render_mode == 'geojson':
+            geojson_layer.add_columns(chapters)
+        else:
+            popups = fragment_template(POPUP_TEMPLATE, labels).render_columns(chapters)
+            for lat, lon, name, city, color, popup in zip(chapters.lat, chapters.lon, chapters.chapter,
+                                                          chapters.city, colors, popups):
+                folium.Marker(
+                    [lat, lon],
+                    popup=folium.Popup(popup, max_width=280),
+                    tooltip=escape(f"{name} - {city}"),
+                    icon=folium.Icon(
+                        color=color,
+                        icon='info-sign',
+                        prefix='fa'
+                    )
+                ).add_to(marker_layer)
+
+        if chapter_list_html is None:
+            legend_items = fragment_template(LEGEND_ROW_TEMPLATE).render_columns(chapters, colors)
 
-    # Generate event list HTML (sorted by date)
-    event_items = []
-    for event in itsmf_events_sorted:
-        color = country_colors[event['country']]
-        event_items.append(
-            f'''
-            <div style="margin: 8px 0; padding: 5px; border-left: 3px solid {color}; background-color: #f9f9f9; border-radius: 0 3px 3px 0;">
-                <div style="font-weight: bold; color: {color};">{event['country']}</div>
-                <div style="font-size: 12px; margin: 2px 0;">
-                    <strong>{event['date']}</strong><br>
-                    {event['title']}<br>
-                    <a href="{event['link']}" target="_blank" style="color: #0066cc; font-size: 11px;">More info</a>
+        if nearest_lookup:
+            names = [{'chapter': name, 'city': city} for name, city in zip(chapters.chapter, chapters.city)]
+            NearestChapterLookup(ChapterIndex(names, chapters.lat, chapters.lon), labels['nearest_chapter']).add_to(m)
+
+    # Add the company logo (cached, resized and recompressed by itsmf_assets),
+    # or a placeholder if the logo file is missing
+    with instrument.stage('logo'):
+        if logo_mode is not None:
+            logo = prepare_logo(LOGO_FILE)
+            if logo is None:
+                print("ITSMF logo file not found. Using placeholder.")
+                logo_html = '''
+                <div style="position: fixed;
+                            top: 10px; left: 10px; width: 240px; height: 80px;
+                            background-color: white; border: 2px solid #333;
+                            z-index:9999; font-size:14px; text-align:center;
+                            padding: 10px; border-radius: 5px; box-shadow: 0 2px 5px rgba(0,0,0,0.3);">
+                    <strong>ITSMF APAC</strong>
+                    <br><small>Chapter Locations</small>
+                </div>
+                '''
+            else:
+                logo_html = f'''
+                <div style="position: fixed;
+                            top: 10px; left: 10px; width: 240px; height: 80px;
+                            z-index:9999; background: white; border: 2px solid #333;
+                            border-radius: 5px; box-shadow: 0 2px 5px rgba(0,0,0,0.3);">
+                    <img src="{logo_src(logo, logo_mode, asset_dir, out_dir)}" alt="ITSMF APAC"
+                         style="width: 100%; height: 100%; object-fit: contain;">
                 </div>
+                '''
+            m.get_root().html.add_child(folium.Element(logo_html))
+
+    # Generate event list HTML (sorted by date) unless it was supplied
+    with instrument.stage('event_list'):
+        if event_list_html is None:
+            event_list_html = render_event_list(itsmf_events_sorted, country_colors, labels,
+                                                event_list, event_page_size)
+
+    with instrument.stage('panels'):
+        legend_html = f'''
+        <div style="position: fixed;
+                    top: 20px; right: 20px; width: 450px; height: auto;
+                    background-color: white; border: 2px solid #333; z-index:9999;
+                    font-size: 13px; padding: 15px; border-radius: 8px;
+                    box-shadow: 0 4px 8px rgba(0,0,0,0.3);">
+
+            <h4 style="margin-top: 0; color: #333; text-align: center; border-bottom: 1px solid #ccc; padding-bottom: 5px;">
+                {labels['legend_title']}
+            </h4>
+            {''.join(legend_items) if chapter_list_html is None else chapter_list_html}
+
+            <hr style="border-top: 1px solid #ccc; margin: 15px 0;">
+
+            <h4 style="margin-top: 0; color: #333; text-align: center; border-bottom: 1px solid #ccc; padding-bottom: 5px;">
+                {labels['events_title']}
+            </h4>
+
+            <div style="max-height: 300px; overflow-y: auto; margin-top: 10px;">
+                {event_list_html}
             </div>
-            '''
-        )
+        </div>
+        '''
 
-    legend_html = f'''
-    <div style="position: fixed;
-                top: 20px; right: 20px; width: 450px; height: auto;
-                background-color: white; border: 2px solid #333; z-index:9999;
-                font-size: 13px; padding: 15px; border-radius: 8px;
-                box-shadow: 0 4px 8px rgba(0,0,0,0.3);">
+        m.get_root().html.add_child(folium.Element(legend_html))
 
+        # Create info panel
+        info_html = f'''
+        <div style="position: fixed;
+                    top: 200px; left: 20px; width: 350px; height: 200px;
+                    background-color: white; border: 2px solid #333; z-index:9999;
+                    font-size: 12px; padding: 15px; border-radius: 5px;
+                    box-shadow: 0 2px 5px rgba(0,0,0,0.3);">
         <h4 style="margin-top: 0; color: #333; text-align: center; border-bottom: 1px solid #ccc; padding-bottom: 5px;">
-            ITSMF APAC Chapters
+            {labels['about_title']}
         </h4>
-        {''.join(legend_items)}
+        <p style="margin: 8px 0; line-height: 1.4;">
+            {labels['about_org']}
+        </p>
+        <p style="margin: 8px 0; line-height: 1.4;">
+            {labels['about_chapters']}
+        </p>
+        <div style="font-size: 11px; color: #666; text-align: center; margin-top: 15px;">
+            <em>{labels['about_hint']}</em>
+        </div>
+        </div>
+        '''
 
-        <hr style="border-top: 1px solid #ccc; margin: 15px 0;">
+        m.get_root().html.add_child(folium.Element(info_html))
 
-        <h4 style="margin-top: 0; color: #333; text-align: center; border-bottom: 1px solid #ccc; padding-bottom: 5px;">
-            Upcoming Events 🗓️
-        </h4>
+        # Add a title to the map
+        title_html = f'''
+        <h2 style="position: absolute; top: 100px; left: 50%; transform: translateX(-50%);
+                   z-index: 1000; background: rgba(255,255,255,0.9);
+                   padding: 15px 30px; border-radius: 10px; margin: 0;
+                   box-shadow: 0 2px 10px rgba(0,0,0,0.3); color: #333;
+                   font-family: Arial, sans-serif;">
+            {labels['map_title']}
+        </h2>
+        '''
 
-        <div style="max-height: 300px; overflow-y: auto; margin-top: 10px;">
-            {''.join(event_items)}
-        </div>
-    </div>
-    '''
-
-    m.get_root().html.add_child(folium.Element(legend_html))
-
-    # Create info panel
-    info_html = '''
-    <div style="position: fixed;
-                top: 200px; left: 20px; width: 350px; height: 200px;
-                background-color: white; border: 2px solid #333; z-index:9999;
-                font-size: 12px; padding: 15px; border-radius: 5px;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.3);">
-    <h4 style="margin-top: 0; color: #333; text-align: center; border-bottom: 1px solid #ccc; padding-bottom: 5px;">
-        About ITSMF APAC
-    </h4>
-    <p style="margin: 8px 0; line-height: 1.4;">
-        <strong>IT Service Management Forum (ITSMF)</strong> is a global organization
-        promoting best practices in IT Service Management across the Asia-Pacific region.
-    </p>
-    <p style="margin: 8px 0; line-height: 1.4;">
-        These chapters provide local networking, training, and certification opportunities
-        for ITSM professionals.
-    </p>
-    <div style="font-size: 11px; color: #666; text-align: center; margin-top: 15px;">
-        <em>Click on markers for chapter details and website links</em>
-    </div>
-    </div>
-    '''
-
-    m.get_root().html.add_child(folium.Element(info_html))
-
-    # Add a title to the map
-    title_html = '''
-    <h2 style="position: absolute; top: 100px; left: 50%; transform: translateX(-50%);
-               z-index: 1000; background: rgba(255,255,255,0.9);
-               padding: 15px 30px; border-radius: 10px; margin: 0;
-               box-shadow: 0 2px 10px rgba(0,0,0,0.3); color: #333;
-               font-family: Arial, sans-serif;">
-        ITSMF Asia-Pacific Chapter Locations
-    </h2>
-    '''
-
-    m.get_root().html.add_child(folium.Element(title_html))
+        m.get_root().html.add_child(folium.Element(title_html))
 
     return m
 
 # Generate and save the map
 if __name__ == "__main__":
-    # Create the map
-    itsmf_map = create_itsmf_apac_map()
+    from itsmf_build_cache import build_map_html
 
-    # Save the map
+    # Set ITSMF_PROFILE=<prefix> to time the build stages; the report is
+    # written to <prefix>.json and a flame graph input to <prefix>.folded
+    profile = os.environ.get('ITSMF_PROFILE')
+    instrument = None
+    if profile:
+        from itsmf_instrument import Instrumentation
+        instrument = Instrumentation()
+
+    # Create and save the map, skipping the render if no input changed
     output_file = "itsmf_apac_chapters.html"
-    itsmf_map.save(output_file)
+    status = build_map_html(output_file, force=bool(profile), instrument=instrument)
+    if instrument is not None:
+        instrument.close()
+        instrument.write_json(profile + '.json')
+        instrument.write_collapsed(profile + '.folded')
+        print(f"Build profile written to '{profile}.json' and '{profile}.folded'")
 
-    print(f"ITSMF APAC map has been saved as '{output_file}'")
+    if status == 'unchanged':
+        print(f"ITSMF APAC map '{output_file}' is up to date")
+    else:
+        print(f"ITSMF APAC map has been saved as '{output_file}' ({status} rebuild)")
     print("\nMap includes ITSMF chapters in:")
-    for chapter in itsmf_chapters:
+    for chapter in iter_chapters(CHAPTERS_FILE):
         print(f"- {chapter['country']} ({chapter['city']})")
 
     print("\nEach chapter includes website links in the marker popups and legend")
     print("\nTo customize:")
     print("1. Add 'itsmf-logo.png' file for ITSMF branding")
-    print("2. Modify chapter details or add more locations as needed")
-
-    # Optional: Open the map in the default browser
-    import webbrowser
-    abs_path = os.path.abspath(output_file)
-    webbrowser.open(f'file://{abs_path}')
+    print(f"2. Edit '{CHAPTERS_FILE}' and '{EVENTS_FILE}' to change chapters and events")
+    print("\nUse 'python itsmf_cli.py render --open' to also open the map in a browser")
@@ -0,0 +1,314 @@
+"""
+Command line entry point for the ITSMF APAC map.
+
+    python itsmf_cli.py render [--open]        build the map page
+    python itsmf_cli.py render --sharded       shell page plus per-region shards
+    python itsmf_cli.py list chapters|events   print the records
+    python itsmf_cli.py validate               check the data files
+    python itsmf_cli.py export chapters|events OUT.csv|OUT.jsonl
+    python itsmf_cli.py export all [DIR]       map, Markdown, JSON and .ics in one pass
+    python itsmf_cli.py links                  check websites and event links
+
+Only `render` imports folium; the other commands load just the data
+helpers, and nothing ever opens a browser unless `--open` is given.
+"""
+import argparse
+import csv
+import json
+import sys
+
+from itsmf_data import (CHAPTER_FIELDS, CHAPTERS_FILE, COUNTRY_COLORS, EVENT_FIELDS,
+                        EVENTS_FILE, iter_chapters, iter_events, iter_records, write_records)
+from itsmf_regions import DEFAULT_REGION, REGIONS
+
+LIST_FORMATS = ('table', 'csv', 'jsonl')
+
+
+def _select(args, chapters=None, events=None):
+    """Apply the --country/--upcoming filters shared by list and export."""
+    countries = set(args.country) if args.country else None
+    if chapters is not None:
+        return (c for c in chapters if countries is None or c['country'] in countries)
+
+    if args.upcoming is not None:
+        # Answered from the persisted event index by binary search
+        return list(_event_index(args).upcoming(args.upcoming, countries))
+
+    from itsmf_dates import event_date_ordinal
+
+    records = [e for e in events if countries is None or e['country'] in countries]
+    records.sort(key=lambda e: event_date_ordinal(e['date']))
+    return records
+
+
+def _event_index(args):
+    """The EventIndex of --events, rebuilt only when the file changed."""
+    from itsmf_event_index import load_event_index
+
+    return load_event_index(args.events)
+
+
+def _load(args):
+    if args.kind == 'chapters':
+        return CHAPTER_FIELDS, _select(args, chapters=iter_chapters(args.chapters))
+    return EVENT_FIELDS, _select(args, events=iter_events(args.events))
+
+
+def cmd_render(args):
+    if args.check_links and cmd_links(args) != 0:
+        print("Not rendering: fix the broken links above or drop --check-links")
+        return 1
+
+    from itsmf_build_cache import build_map_html
+
+    map_options = {
+        'language': args.language,
+        'event_list': args.event_list,
+        'logo_mode': args.logo_mode,
+        'region': args.region,
+    }
+    if args.upcoming is not None:
+        map_options['upcoming_days'] = args.upcoming
+    if args.country:
+        map_options['event_countries'] = args.country
+    if args.local_tiles:
+        # Tiles prefetched by itsmf_tiles, exported as files next to the page
+        import os
+        from itsmf_tiles import LOCAL_TILE_URL, export_tiles
+
+        written, max_zoom = export_tiles(os.path.dirname(os.path.abspath(args.output)))
+        if max_zoom is None:
+            print("No prefetched tiles: run 'python itsmf_tiles.py prefetch --url TEMPLATE --contact EMAIL' first")
+            return 1
+        map_options.update(tiles=LOCAL_TILE_URL, tiles_max_zoom=max_zoom)
+    elif args.tiles:
+        # Any tile server; its highest zoom is only known if given
+        map_options.update(tiles=args.tiles, tiles_max_zoom=args.tiles_max_zoom)
+
+    if args.sharded:
+        # One shell page plus a chapter shard per region, loaded on demand
+        from itsmf_regions import write_sharded_map
+
+        counts = write_sharded_map(args.output, iter_chapters(args.chapters), _event_index(args),
+                                   vendor=args.vendor, inline_critical=args.inline_critical,
+                                   publish=args.publish, **map_options)
+        print(f"{args.output}: written with shards for "
+              + ', '.join(f"{name} ({count})" for name, count in counts.items() if count))
+        return 0
+    map_options.update(render_mode=args.render_mode, nearest_lookup=args.nearest_lookup)
+
+    instrument = None
+    if args.profile:
+        from itsmf_instrument import Instrumentation
+        instrument = Instrumentation()
+
+    status = build_map_html(
+        args.output, args.chapters, _event_index(args),
+        force=args.force or bool(args.profile), vendor=args.vendor,
+        inline_critical=args.inline_critical, publish=args.publish,
+        instrument=instrument, **map_options
+    )
+    print(f"{args.output}: {status}")
+    if instrument is not None:
+        instrument.close()
+        instrument.write_json(args.profile + '.json')
+        instrument.write_collapsed(args.profile + '.folded')
+        print(f"Build profile written to '{args.profile}.json' and '{args.profile}.folded'")
+    if args.open:
+        import os
+        import webbrowser
+        webbrowser.open('file://' + os.path.abspath(args.output))
+    return 0
+
+
+def cmd_list(args):
+    fields, records = _load(args)
+    if args.format == 'jsonl':
+        for record in records:
+            print(json.dumps({k: record.get(k) for k in fields}, ensure_ascii=False))
+    elif args.format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=fields, extrasaction='ignore', lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(records)
+    elif args.kind == 'chapters':
+        for c in records:
+            print(f"{c['country']:<12} {c['city']:<16} {c['lat']:>9.4f} {c['lon']:>9.4f}  {c['website']}")
+    else:
+        for e in records:
+            print(f"{e['date']:<30} {e['country']:<12} {e['title']}")
+    return 0
+
+
+def validate_chapters(path):
+    """Yield (line, message) for every problem in a chapter file."""
+    seen = set()
+    geocoder = None
+    for line, row in enumerate(iter_records(path), 2):
+        # Blank coordinates are filled in from the gazetteer when rendering (see iter_chapters)
+        geocoded = row.get('lat') in (None, '') or row.get('lon') in (None, '')
+        for field in CHAPTER_FIELDS:
+            if field not in ('details', 'lat', 'lon') and not str(row.get(field) or '').strip():
+                yield line, f"missing {field}"
+        if row.get('country') and row['country'] not in COUNTRY_COLORS:
+            yield line, f"no color for country {row['country']!r}"
+        if geocoded:
+            if geocoder is None:
+                from itsmf_geocode import Geocoder
+                geocoder = Geocoder()
+            if geocoder.resolve(row.get('city'), row.get('country')) is None:
+                yield line, f"no coordinates and no gazetteer entry for {row.get('city')!r}"
+        for field, limit in () if geocoded else (('lat', 90), ('lon', 180)):
+            try:
+                value = float(row.get(field))
+            except (TypeError, ValueError):
+                yield line, f"{field} is not a number: {row.get(field)!r}"
+                continue
+            if not -limit <= value <= limit:
+                yield line, f"{field} out of range: {value}"
+        website = row.get('website') or ''
+        if website and not website.startswith(('http://', 'https://')):
+            yield line, f"website is not an http(s) URL: {website!r}"
+        if row.get('chapter') in seen:
+            yield line, f"duplicate chapter {row['chapter']!r}"
+        seen.add(row.get('chapter'))
+
+
+def validate_events(path):
+    """Yield (line, message) for every problem in an event file."""
+    from itsmf_dates import event_date_ordinal
+
+    for line, row in enumerate(iter_records(path), 2):
+        for field in EVENT_FIELDS:
+            if not str(row.get(field) or '').strip():
+                yield line, f"missing {field}"
+        if row.get('country') and row['country'] not in COUNTRY_COLORS:
+            yield line, f"no color for country {row['country']!r}"
+        if row.get('date'):
+            try:
+                event_date_ordinal(row['date'])
+            except ValueError as exc:
+                yield line, str(exc)
+        link = row.get('link') or ''
+        if link and not link.startswith(('http://', 'https://')):
+            yield line, f"link is not an http(s) URL: {link!r}"
+
+
+def cmd_validate(args):
+    problems = 0
+    for path, check in ((args.chapters, validate_chapters), (args.events, validate_events)):
+        for line, message in check(path):
+            print(f"{path}:{line}: {message}")
+            problems += 1
+    print(f"{problems} problem(s) found" if problems else "Data files are valid")
+    return 1 if problems else 0
+
+
+def cmd_links(args):
+    from itsmf_http import DEFAULT_HOST_INTERVAL
+    from itsmf_links import format_results, run_check
+
+    # render --check-links has no --host-interval
+    host_interval = getattr(args, 'host_interval', None)
+    if host_interval is None:
+        host_interval = DEFAULT_HOST_INTERVAL
+    links, results = run_check(iter_chapters(args.chapters), iter_events(args.events), ttl=args.ttl,
+                               host_interval=host_interval)
+    print(format_results(links, results, getattr(args, 'verbose', False)))
+    return 1 if any(r['state'] == 'broken' for r in results.values()) else 0
+
+
+def cmd_export(args):
+    if args.kind == 'all':
+        import os
+        from itsmf_export import export_all, output_paths
+
+        out_dir = args.out or '.'
+        os.makedirs(out_dir, exist_ok=True)
+        paths = output_paths(out_dir, args.formats)
+        chapters, events = export_all(paths, _select(args, chapters=iter_chapters(args.chapters)),
+                                      _select(args, events=iter_events(args.events)))
+        print(f"Exported {chapters} chapters and {events} events to {', '.join(paths.values())}")
+        return 0
+
+    if args.out is None:
+        print("export: an output file is required for chapters and events")
+        return 2
+    fields, records = _load(args)
+    count = write_records(args.out, records, fields)
+    print(f"Wrote {count} {args.kind} to '{args.out}'")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='itsmf_cli.py', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chapters', default=CHAPTERS_FILE, help='chapter CSV/JSONL file')
+    parser.add_argument('--events', default=EVENTS_FILE, help='event CSV/JSONL file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # Choices are spelled out here so that --help does not import the builder
+    render = commands.add_parser('render', help='build the map page')
+    render.add_argument('--output', default='itsmf_apac_chapters.html')
+    render.add_argument('--language', default='en', choices=('en', 'th'))
+    render.add_argument('--render-mode', default='auto',
+                        choices=('auto', 'markers', 'cluster', 'fast_cluster', 'geojson'))
+    render.add_argument('--event-list', default='cards', choices=('cards', 'virtual'))
+    render.add_argument('--logo-mode', default=None, choices=('inline', 'file'))
+    render.add_argument('--upcoming', type=int, metavar='DAYS', help='only events in the next DAYS days')
+    render.add_argument('--country', nargs='+', help='only events for these countries')
+    render.add_argument('--region', default=DEFAULT_REGION, choices=sorted(REGIONS), help='region the map opens on')
+    render.add_argument('--sharded', action='store_true',
+                        help='write a shell page plus per-region chapter shards loaded on demand')
+    render.add_argument('--tiles', metavar='URL', help='tile URL template, e.g. of `itsmf_tiles.py serve`')
+    render.add_argument('--tiles-max-zoom', type=int, metavar='ZOOM',
+                        help='highest zoom the --tiles server has; tiles are scaled up beyond it')
+    render.add_argument('--local-tiles', action='store_true',
+                        help='use the prefetched tiles, exported next to the page')
+    render.add_argument('--nearest-lookup', action='store_true', help='show the nearest chapter on map clicks')
+    render.add_argument('--vendor', action='store_true', help='serve scripts and styles locally')
+    render.add_argument('--inline-critical', action='store_true')
+    render.add_argument('--publish', action='store_true', help='minify and precompress the page')
+    render.add_argument('--force', action='store_true', help='ignore the build cache')
+    render.add_argument('--profile', metavar='PREFIX', help='write a stage profile to PREFIX.json/.folded')
+    render.add_argument('--open', action='store_true', help='open the page in a browser')
+    render.add_argument('--check-links', action='store_true', help='check all links first, stop if any is broken')
+    render.add_argument('--ttl', type=float, default=24 * 3600, help='seconds a link check stays valid')
+    render.set_defaults(func=cmd_render)
+
+    for name, func, help_text in (('list', cmd_list, 'print chapters or events'),
+                                  ('export', cmd_export, 'write chapters or events to a file')):
+        sub = commands.add_parser(name, help=help_text)
+        if name == 'export':
+            sub.add_argument('kind', choices=('chapters', 'events', 'all'))
+            sub.add_argument('out', nargs='?', help='output file (.csv or .jsonl); for all, a directory (default: .)')
+            sub.add_argument('--formats', nargs='+', choices=('map', 'markdown', 'json', 'ics'),
+                             default=['map', 'markdown', 'json', 'ics'], help='all: formats to write')
+        else:
+            sub.add_argument('kind', choices=('chapters', 'events'))
+            sub.add_argument('--format', choices=LIST_FORMATS, default='table')
+        sub.add_argument('--country', nargs='+', help='only these countries')
+        sub.add_argument('--upcoming', type=int, metavar='DAYS', help='events: only the next DAYS days')
+        sub.set_defaults(func=func)
+
+    validate = commands.add_parser('validate', help='check the chapter and event files')
+    validate.set_defaults(func=cmd_validate)
+
+    links = commands.add_parser('links', help='check chapter websites and event links')
+    links.add_argument('--ttl', type=float, default=24 * 3600, help='seconds a result stays valid (0 = recheck all)')
+    links.add_argument('--verbose', action='store_true', help='also list working links')
+    links.add_argument('--host-interval', type=float, metavar='SECONDS',
+                       help='seconds between request starts on one host (default: itsmf_http.DEFAULT_HOST_INTERVAL)')
+    links.set_defaults(func=cmd_links)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'render' and args.sharded and (args.render_mode != 'auto' or args.nearest_lookup):
+        # The shell has no chapters to render or search; the shards bring their own markers
+        parser.error("--render-mode and --nearest-lookup do not apply to --sharded pages")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import sys
+from array import array
+
+from itsmf_data import CHAPTER_FIELDS, DEFAULT_COLOR, EVENT_FIELDS
+
+
+class _Columns:
+    """
+    Records stored as one sequence per field instead of one dict per record.
+
+    Coordinates are array('d'), the text fields lists of str, and the
+    low-cardinality fields (see INTERNED) go through sys.intern, so each
+    distinct value is stored once. Iterating or indexing still yields
+    plain dict records for code that wants them; hot loops zip the
+    columns instead.
+    """
+    __slots__ = ()
+    FIELDS = ()
+    FLOATS = ()
+    INTERNED = ()
+
+    def __init__(self, **columns):
+        for field in self.FIELDS:
+            setattr(self, field, columns[field])
+
+    @classmethod
+    def from_records(cls, records):
+        """Build the columns from an iterable of records in one pass; missing fields become ''."""
+        if isinstance(records, cls):
+            return records
+        columns = {field: array('d') if field in cls.FLOATS else [] for field in cls.FIELDS}
+        appends = [(field, columns[field].append, field in cls.INTERNED) for field in cls.FIELDS]
+        intern = sys.intern
+        for record in records:
+            for field, append, interned in appends:
+                value = record.get(field, '')
+                append(intern(value) if interned else value)
+        return cls(**columns)
+
+    def __len__(self):
+        return len(getattr(self, self.FIELDS[0]))
+
+    def __getitem__(self, index):
+        return {field: getattr(self, field)[index] for field in self.FIELDS}
+
+    def __iter__(self):
+        fields = self.FIELDS
+        for values in zip(*(getattr(self, field) for field in fields)):
+            yield dict(zip(fields, values))
+
+    def take(self, indices):
+        """Return new columns holding the records at `indices`, in that order."""
+        indices = [int(i) for i in indices]
+        columns = {}
+        for field in self.FIELDS:
+            column = getattr(self, field)
+            values = [column[i] for i in indices]
+            columns[field] = array('d', values) if field in self.FLOATS else values
+        return type(self)(**columns)
+
+    def column_values(self, fields):
+        """Return the columns of `fields`, e.g. FragmentTemplate.fields, in that order."""
+        return [getattr(self, field) for field in fields]
+
+
+class ChapterColumns(_Columns):
+    __slots__ = tuple(CHAPTER_FIELDS)
+    FIELDS = tuple(CHAPTER_FIELDS)
+    FLOATS = ('lat', 'lon')
+    INTERNED = ('country',)
+
+
+class EventColumns(_Columns):
+    __slots__ = tuple(EVENT_FIELDS)
+    FIELDS = tuple(EVENT_FIELDS)
+    INTERNED = ('country', 'date')
+
+
+def colors_for(countries, country_colors, default=DEFAULT_COLOR):
+    """Map a country column to its colors, unknown countries getting `default`."""
+    # One lookup per distinct country; the column holds interned strings
+    lookup = {country: country_colors.get(country, default) for country in set(countries)}
+    return list(map(lookup.__getitem__, countries))
+
+
+def event_columns(events):
+    """
+    Return EventColumns for events in their given order.
+
+    SortedEvents over EventColumns (as built by create_itsmf_apac_map)
+    are reordered column by column without creating any dicts.
+    """
+    source = getattr(events, 'source', None)
+    if isinstance(source, EventColumns):
+        return source.take(events.order)
+    return EventColumns.from_records(events)
@@ -0,0 +1,244 @@
+import csv
+import json
+import os
+import random
+import stat
+import tempfile
+from datetime import date, timedelta
+
+# Default data files, relative to this script
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CHAPTERS_FILE = os.path.join(DATA_DIR, 'itsmf_chapters.csv')
+EVENTS_FILE = os.path.join(DATA_DIR, 'itsmf_events.csv')
+
+CHAPTER_FIELDS = ['country', 'city', 'lat', 'lon', 'chapter', 'details', 'website']
+EVENT_FIELDS = ['country', 'date', 'title', 'link']
+
+# Marker and legend color per country (folium.Icon color names); kept here
+# rather than in the map builder so tools that never render need not import folium
+COUNTRY_COLORS = {
+    'India': 'orange',
+    'Malaysia': 'green',
+    'Thailand': 'red',
+    'Hong Kong': 'purple',
+    'Australia': 'blue',
+    'New Zealand': 'darkgreen'
+}
+# Color for countries missing from the table
+DEFAULT_COLOR = 'gray'
+
+
+def iter_records(path):
+    """Yield one dict per row of a CSV or JSONL file without loading the whole file."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if ext == '.csv':
+            for row in csv.DictReader(f):
+                yield row
+        elif ext in ('.jsonl', '.ndjson'):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported data file format: {path}")
+
+
+def iter_chapters(path=CHAPTERS_FILE):
+    """
+    Stream chapter records, converting coordinates to floats.
+
+    Rows with a blank lat/lon are geocoded from their city and country
+    with the local gazetteer (see itsmf_geocode).
+    """
+    geocoder = None
+    try:
+        for row in iter_records(path):
+            if row.get('lat') in (None, '') or row.get('lon') in (None, ''):
+                if geocoder is None:
+                    from itsmf_geocode import Geocoder
+                    geocoder = Geocoder()
+                yield next(geocoder.geocode([row]))
+                continue
+            row['lat'] = float(row['lat'])
+            row['lon'] = float(row['lon'])
+            yield row
+    finally:
+        if geocoder is not None:
+            geocoder.save()
+
+
+def iter_events(path=EVENTS_FILE):
+    """Stream event records."""
+    for row in iter_records(path):
+        yield row
+
+
+def file_key(path):
+    """Identify a file's contents by its path, mtime and size, for caches built from it."""
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def write_records(path, records, fields):
+    """
+    Write an iterable of records to a CSV or JSONL file, one row at a time.
+
+    `path` is only replaced once every record is written (see
+    AtomicFile), so the records may be streamed from the file itself.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in ('.csv', '.jsonl', '.ndjson'):
+        raise ValueError(f"Unsupported data file format: {path}")
+    count = 0
+    with AtomicFile(path) as f:
+        if ext == '.csv':
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            for record in records:
+                writer.writerow(record)
+                count += 1
+        else:
+            for record in records:
+                f.write(json.dumps({k: record.get(k) for k in fields}, ensure_ascii=False))
+                f.write('\n')
+                count += 1
+    return count
+
+
+# Read once: os.umask can only be queried by setting it
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def _replacement_mode(path):
+    """Mode for a file replacing `path`: its current mode, or what open() would create."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+class AtomicFile:
+    """
+    A file written under a temporary name next to `path`, moved into place by commit().
+
+    Readers never see a partial file. The committed file keeps the mode
+    of the file it replaces, or gets the one open() would give a new
+    file, rather than mkstemp's 0600, so web servers can still read
+    published pages. As a context manager it yields the open file and
+    commits on success or aborts on error.
+    """
+    __slots__ = ('path', 'tmp_path', 'file')
+
+    def __init__(self, path, mode='w'):
+        self.path = path
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp-')
+        if 'b' in mode:
+            self.file = os.fdopen(fd, mode)
+        else:
+            self.file = os.fdopen(fd, mode, encoding='utf-8', newline='')
+
+    def __enter__(self):
+        return self.file
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def commit(self):
+        """Close the temporary file and move it into place; returns the path."""
+        self.file.close()
+        os.chmod(self.tmp_path, _replacement_mode(self.path))
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        """Close and delete the temporary file, leaving `path` as it was."""
+        self.file.close()
+        try:
+            os.unlink(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def write_atomic(path, data):
+    """Replace `path` with `data` (str or bytes) through an AtomicFile."""
+    with AtomicFile(path, 'wb' if isinstance(data, bytes) else 'w') as f:
+        f.write(data)
+
+
+# Seed chapters used by the synthetic generator
+_SEED_CHAPTERS = [
+    ('India', 'Bangalore', 12.9716, 77.5946),
+    ('Malaysia', 'Kuala Lumpur', 3.1390, 101.6869),
+    ('Thailand', 'Bangkok', 13.7563, 100.5018),
+    ('Hong Kong', 'Hong Kong', 22.3193, 114.1694),
+    ('Australia', 'Melbourne', -37.8136, 144.9631),
+    ('New Zealand', 'Auckland', -36.8485, 174.7633),
+]
+
+_EVENT_TOPICS = [
+    'ITSM and Business Continuity',
+    'SIAM Bodies of Knowledge',
+    'AI-Driven ITSM: Live Demo',
+    'ITIL 4 Practitioner Meetup',
+    'Service Desk Automation',
+    'Value Stream Mapping Workshop',
+]
+
+
+def synthetic_chapters(count, seed=0):
+    """Generate `count` fake chapter sites scattered around the real chapter cities."""
+    rng = random.Random(seed)
+    for i in range(count):
+        country, city, lat, lon = _SEED_CHAPTERS[i % len(_SEED_CHAPTERS)]
+        yield {
+            'country': country,
+            'city': f"{city} #{i}",
+            'lat': round(lat + rng.uniform(-2.0, 2.0), 4),
+            'lon': round(lon + rng.uniform(-2.0, 2.0), 4),
+            'chapter': f"ITSMF {country} - Site {i}",
+            'details': 'Synthetic chapter site',
+            'website': f"https://example.org/{country.lower().replace(' ', '-')}/{i}",
+        }
+
+
+def synthetic_events(count, seed=0, start=date(2025, 1, 1), days=730):
+    """Generate `count` fake events, mixing the date formats used in the real data."""
+    rng = random.Random(seed)
+    for i in range(count):
+        country = _SEED_CHAPTERS[i % len(_SEED_CHAPTERS)][0]
+        day = start + timedelta(days=rng.randrange(days))
+        if i % 2:
+            date_str = day.strftime('%A, %d %B %Y')
+        else:
+            date_str = day.strftime('%d %B %Y')
+        yield {
+            'country': country,
+            'date': date_str,
+            'title': f"ITSMF {country}: {rng.choice(_EVENT_TOPICS)}",
+            'link': f"https://example.org/events/{i}",
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate synthetic ITSMF chapter and event files')
+    parser.add_argument('--chapters', type=int, default=10000, help='number of chapter rows')
+    parser.add_argument('--events', type=int, default=100000, help='number of event rows')
+    parser.add_argument('--out-dir', default='synthetic', help='output directory')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    chapters_path = os.path.join(args.out_dir, f"itsmf_chapters.{args.format}")
+    events_path = os.path.join(args.out_dir, f"itsmf_events.{args.format}")
+    n = write_records(chapters_path, synthetic_chapters(args.chapters, args.seed), CHAPTER_FIELDS)
+    print(f"Wrote {n} chapters to '{chapters_path}'")
+    n = write_records(events_path, synthetic_events(args.events, args.seed), EVENT_FIELDS)
+    print(f"Wrote {n} events to '{events_path}'")
@@ -0,0 +1,134 @@
+import re
+from datetime import date
+from functools import lru_cache
+from operator import itemgetter
+
+import numpy as np
+
+from itsmf_columns import EventColumns
+
+# Month names and abbreviations; matched case-insensitively and without
+# going through the locale-dependent strptime('%B')
+MONTHS = {}
+for _i, _name in enumerate(['january', 'february', 'march', 'april', 'may', 'june', 'july',
+                            'august', 'september', 'october', 'november', 'december'], 1):
+    MONTHS[_name] = _i
+    MONTHS[_name[:3]] = _i
+MONTHS['sept'] = 9
+
+# Supported date shapes, detected by one regex each instead of a
+# strptime try/except chain:
+#   'Thursday, 11 September 2025' / '09 October 2025' / '9 Oct 2025'
+#   'September 11, 2025' / 'Thursday, September 11, 2025'
+#   '2025-09-11'
+#   '11/09/2025' (day first, as used by the APAC chapters)
+_DAY_MONTH_YEAR = re.compile(r'^(?:[A-Za-z]+,?\s+)?(\d{1,2})\s+([A-Za-z]+)\.?,?\s+(\d{4})$')
+_MONTH_DAY_YEAR = re.compile(r'^(?:[A-Za-z]+,\s+)?([A-Za-z]+)\.?\s+(\d{1,2}),?\s+(\d{4})$')
+_ISO = re.compile(r'^(\d{4})-(\d{2})-(\d{2})')
+_DAY_FIRST_NUMERIC = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{4})$')
+
+
+def _month(name, date_str):
+    try:
+        return MONTHS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown month in event date: {date_str!r}") from None
+
+
+@lru_cache(maxsize=65536)
+def event_date_ordinal(date_str):
+    """Return the proleptic Gregorian ordinal of an event date string (memoised)."""
+    s = date_str.strip()
+    match = _DAY_MONTH_YEAR.match(s)
+    if match:
+        day, month, year = match.groups()
+        return date(int(year), _month(month, date_str), int(day)).toordinal()
+    match = _ISO.match(s)
+    if match:
+        year, month, day = match.groups()
+        return date(int(year), int(month), int(day)).toordinal()
+    match = _MONTH_DAY_YEAR.match(s)
+    if match:
+        month, day, year = match.groups()
+        return date(int(year), _month(month, date_str), int(day)).toordinal()
+    match = _DAY_FIRST_NUMERIC.match(s)
+    if match:
+        day, month, year = match.groups()
+        return date(int(year), int(month), int(day)).toordinal()
+    raise ValueError(f"Unrecognised event date format: {date_str!r}")
+
+
+class SortedEvents:
+    """
+    Events in date order, with the parsed dates kept alongside.
+
+    The records stay in their source list and `order` holds the indices
+    that put them in date order, so sorting never shuffles the records
+    themselves. `ordinals` is a numpy int32 array of the date ordinals in
+    sorted order, so date range lookups can use np.searchsorted instead of
+    re-parsing strings.
+    """
+    __slots__ = ('source', 'order', 'ordinals')
+
+    def __init__(self, source, order, ordinals):
+        self.source = source
+        self.order = order
+        self.ordinals = ordinals
+
+    def __iter__(self):
+        return map(self.source.__getitem__, self.order.tolist())
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SortedEvents(self.source, self.order[index], self.ordinals[index])
+        return self.source[self.order[index]]
+
+    def date_of(self, index):
+        """Return the parsed date of the event at `index`."""
+        return date.fromordinal(int(self.ordinals[index]))
+
+    def filter(self, predicate):
+        """Return the events for which `predicate(event)` is true, still in date order."""
+        keep = np.fromiter(map(predicate, self), dtype=bool, count=len(self))
+        return SortedEvents(self.source, self.order[keep], self.ordinals[keep])
+
+    def between(self, start=None, end=None):
+        """Return the events dated in [start, end) as a new SortedEvents."""
+        lo = 0 if start is None else int(np.searchsorted(self.ordinals, start.toordinal(), 'left'))
+        hi = len(self) if end is None else int(np.searchsorted(self.ordinals, end.toordinal(), 'left'))
+        return self[lo:hi]
+
+
+def sort_events(events):
+    """
+    Parse every event date once and return the events as SortedEvents.
+
+    Each distinct date string is parsed only once, and the sort is a
+    stable numpy argsort over integer day offsets, so events on the same
+    day keep their input order. An itsmf_columns.EventColumns is sorted
+    in place of a list, reading its date column directly.
+    """
+    if not isinstance(events, (list, EventColumns)):
+        events = list(events)
+    if not len(events):
+        empty = np.empty(0, dtype=np.int32)
+        return SortedEvents(events, empty, empty)
+
+    if isinstance(events, EventColumns):
+        date_strings = events.date
+    else:
+        date_strings = list(map(itemgetter('date'), events))
+    parsed = {s: event_date_ordinal(s) for s in set(date_strings)}
+    ordinals = np.fromiter(map(parsed.__getitem__, date_strings),
+                           dtype=np.int32, count=len(events))
+
+    # Day offsets usually fit in 16 bits, where numpy's stable sort is a radix sort
+    first = int(ordinals.min())
+    if int(ordinals.max()) - first < 65536:
+        order = np.argsort((ordinals - first).astype(np.uint16), kind='stable')
+    else:
+        order = np.argsort(ordinals, kind='stable')
+    return SortedEvents(events, order, ordinals[order])
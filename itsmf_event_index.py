@@ -0,0 +1,138 @@
+import hashlib
+import os
+import pickle
+from datetime import date, timedelta
+
+import numpy as np
+
+from itsmf_data import EVENTS_FILE, AtomicFile, file_key, iter_events
+from itsmf_dates import SortedEvents, sort_events
+
+INDEX_DIR = '.itsmf_cache'
+# Bump when the pickled layout changes
+INDEX_VERSION = 1
+
+
+class EventIndex:
+    """
+    Events indexed by country and date.
+
+    `events` is the SortedEvents of all events. For every country,
+    `by_country` holds that country's positions in `events` together with
+    their date ordinals, both sorted by date, so a date window for a set of
+    countries costs one binary search per country plus the size of the
+    answer, instead of a scan over every event.
+
+    `source_key` is the identity of the events file the index was built
+    from (see load_event_index), or None for in-memory records.
+    """
+    __slots__ = ('events', 'by_country', 'source_key')
+
+    def __init__(self, events, by_country, source_key=None):
+        self.events = events
+        self.by_country = by_country
+        self.source_key = source_key
+
+    @classmethod
+    def build(cls, events):
+        """Index an iterable of event records (or a SortedEvents)."""
+        if not isinstance(events, SortedEvents):
+            events = sort_events(events)
+        positions = {}
+        for position, event in enumerate(events):
+            positions.setdefault(event['country'], []).append(position)
+
+        by_country = {}
+        for country, country_positions in positions.items():
+            country_positions = np.array(country_positions, dtype=np.int64)
+            by_country[country] = (events.ordinals[country_positions], country_positions)
+        return cls(events, by_country)
+
+    def __len__(self):
+        return len(self.events)
+
+    def countries(self):
+        return list(self.by_country)
+
+    def query(self, start=None, end=None, countries=None):
+        """
+        Return the events dated in [start, end) for `countries` as SortedEvents.
+
+        `start`/`end` are dates (None = unbounded) and `countries` an
+        iterable of country names (None = all countries).
+        """
+        if countries is None:
+            return self.events.between(start, end)
+
+        lo_key = None if start is None else start.toordinal()
+        hi_key = None if end is None else end.toordinal()
+        slices = []
+        for country in countries:
+            entry = self.by_country.get(country)
+            if entry is None:
+                continue
+            ordinals, positions = entry
+            lo = 0 if lo_key is None else int(np.searchsorted(ordinals, lo_key, 'left'))
+            hi = len(ordinals) if hi_key is None else int(np.searchsorted(ordinals, hi_key, 'left'))
+            if hi > lo:
+                slices.append(positions[lo:hi])
+
+        if not slices:
+            picked = np.empty(0, dtype=np.int64)
+        else:
+            # Positions in the global date order; sorting them merges the
+            # per-country runs back into one date-ordered list
+            picked = np.sort(np.concatenate(slices), kind='stable')
+        return SortedEvents(self.events.source, self.events.order[picked], self.events.ordinals[picked])
+
+    def upcoming(self, days, countries=None, today=None):
+        """Events in the next `days` days (today included) for `countries`."""
+        today = today or date.today()
+        return self.query(today, today + timedelta(days=days), countries)
+
+    def save(self, path, source_key=None):
+        """Persist the index (with `source_key` describing what it was built from)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with AtomicFile(path, 'wb') as f:
+            pickle.dump((INDEX_VERSION, source_key, self.events.source, self.events.order,
+                         self.events.ordinals, self.by_country), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, source_key=None):
+        """Load a saved index, or return None if missing, stale, damaged or from another version."""
+        try:
+            with open(path, 'rb') as f:
+                version, saved_key, source, order, ordinals, by_country = pickle.load(f)
+        except (FileNotFoundError, EOFError, ValueError, AttributeError, ImportError,
+                pickle.UnpicklingError):
+            # Truncated, or pickled by code that has since moved or changed
+            return None
+        if version != INDEX_VERSION or saved_key != source_key:
+            return None
+        return cls(SortedEvents(source, order, ordinals), by_country, saved_key)
+
+
+def index_file_for(events_file):
+    """Where the index of `events_file` is saved: one file per events file path."""
+    name = hashlib.sha256(os.path.abspath(events_file).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(INDEX_DIR, f"event_index-{name}.pickle")
+
+
+def load_event_index(events_file=EVENTS_FILE, index_file=None):
+    """
+    Return the EventIndex for `events_file`, rebuilding it only when the file changed.
+
+    The saved index is keyed by the file's path, mtime and size, so a run
+    with unchanged events reads neither the CSV/JSONL nor any date string.
+    By default every events file has its own index file (see
+    index_file_for), so alternating between files rebuilds nothing.
+    """
+    if index_file is None:
+        index_file = index_file_for(events_file)
+    key = file_key(events_file)
+    index = EventIndex.load(index_file, key)
+    if index is None:
+        index = EventIndex.build(iter_events(events_file))
+        index.save(index_file, key)
+        index.source_key = key
+    return index
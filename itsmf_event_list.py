@@ -0,0 +1,116 @@
+import hashlib
+import math
+
+from itsmf_data import DEFAULT_COLOR
+from itsmf_layers import compact_json
+
+# Rows rendered per page; the list keeps two pages of DOM at most
+EVENT_PAGE_SIZE = 20
+# Fixed card height in px (titles are clamped to two lines) and list height
+EVENT_ROW_HEIGHT = 88
+EVENT_LIST_HEIGHT = 300
+
+_SCRIPT = """
+<script>
+(function () {
+    var box = document.getElementById('%(id)s');
+    var spacer = box.firstElementChild, rows = spacer.firstElementChild;
+    var rowHeight = %(row_height)d, pageSize = %(page_size)d;
+    var data = null, shown = -1;
+
+    function esc(s) {
+        return String(s).replace(/[&<>"']/g, function (c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+        });
+    }
+    function card(r) {
+        var color = data.colors[r[0]];
+        return '<div class="itsmf-event" style="border-left-color: ' + color + ';">' +
+            '<div style="font-weight: bold; color: ' + color + ';">' + esc(data.countries[r[0]]) + '</div>' +
+            '<div style="font-size: 12px;"><strong>' + esc(r[1]) + '</strong><br>' +
+            '<span class="itsmf-event-title">' + esc(r[2]) + '</span>' +
+            '<a href="' + esc(r[3]) + '" target="_blank">' + data.more + '</a></div></div>';
+    }
+    function render() {
+        if (data === null) {
+            // The payload is only parsed once the list is first drawn
+            data = JSON.parse(document.getElementById('%(id)s-data').textContent);
+            spacer.style.height = (data.rows.length * rowHeight) + 'px';
+        }
+        var page = Math.floor(box.scrollTop / rowHeight / pageSize);
+        if (page === shown) { return; }
+        shown = page;
+        var first = page * pageSize;
+        var last = Math.min(data.rows.length, first + 2 * pageSize);
+        var html = [];
+        for (var i = first; i < last; i++) { html.push(card(data.rows[i])); }
+        rows.style.transform = 'translateY(' + (first * rowHeight) + 'px)';
+        rows.innerHTML = html.join('');
+    }
+    var pending = false;
+    box.addEventListener('scroll', function () {
+        if (!pending) {
+            pending = true;
+            window.requestAnimationFrame(function () { pending = false; render(); });
+        }
+    }, {passive: true});
+    render();
+})();
+</script>
+"""
+
+_STYLE = """
+<style>
+.itsmf-event { box-sizing: border-box; height: %(row_height)dpx; margin: 0; padding: 5px 5px 5px 8px;
+               border-left: 3px solid #999; border-bottom: 6px solid white;
+               background-color: #f9f9f9; border-radius: 0 3px 3px 0; overflow: hidden; }
+.itsmf-event-title { display: -webkit-box; -webkit-line-clamp: 2; -webkit-box-orient: vertical; overflow: hidden; }
+.itsmf-event a { color: #0066cc; font-size: 11px; }
+</style>
+"""
+
+
+def iter_virtual_event_list(events, country_colors, labels, page_size=EVENT_PAGE_SIZE,
+                            row_height=EVENT_ROW_HEIGHT, height=EVENT_LIST_HEIGHT):
+    """
+    Yield the HTML of a virtual-scroll event list, chunk by chunk.
+
+    The events are emitted as one compact JSON payload (country names and
+    colours are stored once and referenced by index) that the browser only
+    parses when the list is drawn. A small script then keeps just two
+    pages of `page_size` cards in the DOM, positioned inside a spacer as
+    tall as the whole list, so page weight and layout cost no longer grow
+    with the number of events. The payload rows are yielded one at a
+    time, so streaming writers never hold the whole list as one string.
+
+    `page_size` is raised to one more card than fits in `height`, so the
+    two pages always cover the visible part of the list. The element id
+    is derived from the options, so the same list renders to the same
+    bytes on every build.
+    """
+    page_size = max(page_size, math.ceil(height / row_height) + 1)
+    options = f"{page_size}/{row_height}/{height}".encode()
+    list_id = f"itsmf-events-{hashlib.sha256(options).hexdigest()[:8]}"
+    countries = {}
+    colors = []
+
+    yield _STYLE % {'row_height': row_height}
+    yield (f'<div id="{list_id}" style="height: {height}px; overflow-y: auto; position: relative;">'
+           f'<div style="position: relative;"><div></div></div></div>')
+    yield f'<script type="application/json" id="{list_id}-data">{{"rows":['
+    for i, event in enumerate(events):
+        country = event['country']
+        index = countries.get(country)
+        if index is None:
+            index = countries[country] = len(countries)
+            colors.append(country_colors.get(country, DEFAULT_COLOR))
+        row = compact_json([index, event['date'], event['title'], event['link']])
+        yield row if i == 0 else ',' + row
+    yield (f'],"countries":{compact_json(list(countries))},"colors":{compact_json(colors)},'
+           f'"more":{compact_json(labels["more_info"])}}}</script>')
+    yield _SCRIPT % {'id': list_id, 'row_height': row_height, 'page_size': page_size}
+
+
+def virtual_event_list_html(events, country_colors, labels, **options):
+    """Return iter_virtual_event_list(...) as one string."""
+    return ''.join(iter_virtual_event_list(events, country_colors, labels, **options))
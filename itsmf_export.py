@@ -0,0 +1,309 @@
+"""
+Export the chapters and events to every published format in one pass.
+
+    python itsmf_export.py [--out-dir DIR] [--formats map markdown json ics]
+
+The data files are read once. Every chapter and event record is handed
+to each output in turn, so adding a format adds no extra read or parse of
+the data. The outputs are:
+
+    map       the folium map page (through itsmf_build_cache)
+    markdown  the chapter list, itsmf_apac_chapter_list.md
+    json      chapters and events for other sites and scripts
+    ics       an iCalendar feed of the events
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from itsmf_data import AtomicFile, CHAPTER_FIELDS, CHAPTERS_FILE, EVENT_FIELDS, EVENTS_FILE, iter_chapters, iter_events
+from itsmf_dates import sort_events
+
+FORMATS = ('map', 'markdown', 'json', 'ics')
+OUTPUT_FILES = {
+    'map': 'itsmf_apac_chapters.html',
+    'markdown': 'itsmf_apac_chapter_list.md',
+    'json': 'itsmf_apac.json',
+    'ics': 'itsmf_events.ics',
+}
+MARKDOWN_TITLE = 'Chapters in APAC'
+CALENDAR_NAME = 'ITSMF APAC events'
+CALENDAR_PRODID = '-//ITSMF APAC//Chapter map//EN'
+# iCalendar lines are folded at 75 octets (RFC 5545, 3.1)
+ICS_LINE_OCTETS = 75
+
+# One encoder for all records; json.dumps(ensure_ascii=False) builds a new one per call
+_json_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class _Output:
+    """
+    One export format written to a temporary file next to `path`.
+
+    Subclasses get each chapter and each event (with its parsed date) in
+    order, then finish(), which completes the temporary file. close()
+    then moves it into place, so readers never see a partial file, and
+    abort() drops it instead.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.target = AtomicFile(path)
+        self.file = self.target.file
+
+    def chapter(self, record):
+        pass
+
+    def event(self, record, day):
+        pass
+
+    def finish(self):
+        self.file.close()
+
+    def close(self):
+        return self.target.commit()
+
+    def abort(self):
+        self.target.abort()
+
+
+class MarkdownOutput(_Output):
+    """The chapter list as Markdown, one bullet per chapter."""
+
+    def __init__(self, path, title=MARKDOWN_TITLE):
+        super().__init__(path)
+        self.file.write(f"# {title}\n\n")
+
+    def chapter(self, record):
+        website = record['website']
+        link = f"[{record['chapter']}]({website})" if website else record['chapter']
+        self.file.write(f"- {record['country']}: {link}, {record['city']}\n")
+
+
+class JsonOutput(_Output):
+    """
+    {"generated": ..., "chapters": [...], "events": [...]}, one record per line.
+
+    Events get an ISO 'start' date next to their display date.
+    """
+
+    def __init__(self, path, now):
+        super().__init__(path)
+        self.events_started = False
+        self.count = 0
+        self.file.write(f'{{"generated":{json.dumps(now.strftime("%Y-%m-%dT%H:%M:%SZ"))},\n"chapters":[')
+
+    def _item(self, value):
+        self.file.write(('\n' if self.count == 0 else ',\n') + _json_encode(value))
+        self.count += 1
+
+    def _start_events(self):
+        self.file.write('\n],\n"events":[')
+        self.events_started = True
+        self.count = 0
+
+    def chapter(self, record):
+        self._item({field: record[field] for field in CHAPTER_FIELDS})
+
+    def event(self, record, day):
+        if not self.events_started:
+            self._start_events()
+        item = {field: record[field] for field in EVENT_FIELDS}
+        item['start'] = day.isoformat()
+        self._item(item)
+
+    def finish(self):
+        if not self.events_started:
+            self._start_events()
+        self.file.write('\n]}\n')
+        super().finish()
+
+
+def ics_escape(text):
+    """Escape a TEXT value (RFC 5545, 3.3.11)."""
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def ics_fold(line):
+    """Fold a content line into CRLF-terminated lines of at most 75 octets."""
+    if len(line) <= ICS_LINE_OCTETS and line.isascii():
+        return line + '\r\n'
+    data = line.encode('utf-8')
+    if len(data) <= ICS_LINE_OCTETS:
+        return line + '\r\n'
+    parts = []
+    start = 0
+    limit = ICS_LINE_OCTETS
+    while start < len(data):
+        end = min(len(data), start + limit)
+        # Never split a UTF-8 sequence: back off continuation bytes
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode('utf-8'))
+        start = end
+        # Continuation lines start with a space, which counts towards the limit
+        limit = ICS_LINE_OCTETS - 1
+    return '\r\n '.join(parts) + '\r\n'
+
+
+class CalendarOutput(_Output):
+    """The events as an iCalendar feed of all-day VEVENTs."""
+
+    def __init__(self, path, now, name=CALENDAR_NAME):
+        super().__init__(path)
+        self.stamp = now.strftime('%Y%m%dT%H%M%SZ')
+        self._lines('BEGIN:VCALENDAR', 'VERSION:2.0', f"PRODID:{CALENDAR_PRODID}", 'CALSCALE:GREGORIAN',
+                    'METHOD:PUBLISH', f"X-WR-CALNAME:{ics_escape(name)}")
+
+    def _lines(self, *lines):
+        self.file.write(''.join(map(ics_fold, lines)))
+
+    def event(self, record, day):
+        # Stable across exports, so calendar apps update rather than duplicate events
+        key = record['link'] or f"{record['country']}|{record['date']}|{record['title']}"
+        lines = [
+            'BEGIN:VEVENT',
+            f"UID:{hashlib.sha1(key.encode('utf-8')).hexdigest()}@itsmf-apac",
+            f"DTSTAMP:{self.stamp}",
+            f"DTSTART;VALUE=DATE:{day.isoformat().replace('-', '')}",
+            f"DTEND;VALUE=DATE:{(day + timedelta(days=1)).isoformat().replace('-', '')}",
+            f"SUMMARY:{ics_escape(record['title'])}",
+            f"LOCATION:{ics_escape(record['country'])}",
+            f"CATEGORIES:{ics_escape(record['country'])}",
+        ]
+        if record['link']:
+            lines.append(f"URL:{record['link']}")
+        lines.append('END:VEVENT')
+        self._lines(*lines)
+
+    def finish(self):
+        self._lines('END:VCALENDAR')
+        super().finish()
+
+
+class MapOutput:
+    """
+    The map page, built by itsmf_build_cache from the records it is handed.
+
+    The builder needs all chapters before the events, so the records are
+    kept (they are shared with the other outputs, not copied) and the page
+    is built, and written, by finish(); an unchanged page is not rebuilt.
+    """
+
+    def __init__(self, path, **build_options):
+        self.path = path
+        self.build_options = build_options
+        self.chapters = []
+        self.events = []
+        self.status = None
+
+    def chapter(self, record):
+        self.chapters.append(record)
+
+    def event(self, record, day):
+        self.events.append(record)
+
+    def finish(self):
+        from itsmf_build_cache import build_map_html
+
+        self.status = build_map_html(self.path, self.chapters, self.events, **self.build_options)
+
+    def close(self):
+        return self.path
+
+    def abort(self):
+        pass
+
+
+def open_outputs(paths, now=None, **build_options):
+    """Create the outputs for a {format: path} dict; `build_options` go to the map."""
+    now = now or datetime.now(timezone.utc)
+    factories = {
+        'map': lambda path: MapOutput(path, **build_options),
+        'markdown': MarkdownOutput,
+        'json': lambda path: JsonOutput(path, now),
+        'ics': lambda path: CalendarOutput(path, now),
+    }
+    outputs = {}
+    try:
+        for name, path in paths.items():
+            if name not in factories:
+                raise ValueError(f"Unknown export format: {name!r}")
+            outputs[name] = factories[name](path)
+    except BaseException:
+        for output in outputs.values():
+            output.abort()
+        raise
+    return outputs
+
+
+def export_all(paths, chapters=None, events=None, now=None, **build_options):
+    """
+    Write every format in `paths` ({format: path}) from one pass over the data.
+
+    Chapters are streamed to the outputs as they are read; events are
+    sorted by date once (each date string parsed once) and then streamed.
+    Every file is completed in a temporary file, and the map page built
+    last, before any other file is moved into place, so a failure while
+    reading the data, writing or building the map leaves all existing
+    files as they were. Only the final renames, one per file, can fail
+    part-way. Returns (chapter count, event count).
+    """
+    if chapters is None:
+        chapters = iter_chapters(CHAPTERS_FILE)
+    if events is None:
+        events = iter_events(EVENTS_FILE)
+    outputs = list(open_outputs(paths, now, **build_options).values())
+    # The map page is replaced as soon as it is built, so it is finished last
+    finishing = sorted(outputs, key=lambda output: isinstance(output, MapOutput))
+    try:
+        chapter_count = 0
+        for record in chapters:
+            for output in outputs:
+                output.chapter(record)
+            chapter_count += 1
+        events = sort_events(events)
+        for i, record in enumerate(events):
+            day = events.date_of(i)
+            for output in outputs:
+                output.event(record, day)
+        for output in finishing:
+            output.finish()
+    except BaseException:
+        for output in outputs:
+            output.abort()
+        raise
+    for output in outputs:
+        output.close()
+    return chapter_count, len(events)
+
+
+def output_paths(out_dir='.', formats=FORMATS):
+    """Default {format: path} in `out_dir` for the given formats."""
+    return {name: os.path.join(out_dir, OUTPUT_FILES[name]) for name in formats}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chapters', default=CHAPTERS_FILE)
+    parser.add_argument('--events', default=EVENTS_FILE)
+    parser.add_argument('--out-dir', default='.')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    os.makedirs(args.out_dir, exist_ok=True)
+    paths = output_paths(args.out_dir, args.formats)
+    chapters, events = export_all(paths, iter_chapters(args.chapters), iter_events(args.events))
+    print(f"{chapters} chapters and {events} events exported to "
+          f"{', '.join(paths.values())} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
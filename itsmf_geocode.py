@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import pickle
+import re
+import unicodedata
+
+from itsmf_data import CHAPTER_FIELDS, DATA_DIR, AtomicFile, file_key, iter_records, write_records
+
+GAZETTEER_FILE = os.path.join(DATA_DIR, 'gazetteer.csv')
+INDEX_FILE = os.path.join('.itsmf_cache', 'gazetteer.pickle')
+CACHE_FILE = os.path.join('.itsmf_cache', 'geocode.json')
+# Bump when the pickled layout changes
+INDEX_VERSION = 1
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalise(name):
+    """Fold case, accents and punctuation: 'São  Paulo.' -> 'sao paulo'."""
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(' ', name.casefold()).strip()
+
+
+def build_index(path=GAZETTEER_FILE):
+    """
+    Read a gazetteer into lookup tables.
+
+    Returns (by_place, by_name): by_place maps (name, country) and
+    by_name maps a bare name, both normalised, to (lat, lon, population);
+    alternate names map to the same entry and a bare name to its most
+    populous place.
+    """
+    by_place = {}
+    by_name = {}
+    for row in iter_records(path):
+        entry = (float(row['lat']), float(row['lon']), int(row.get('population') or 0))
+        country = normalise(row['country'])
+        names = [row['name']] + [n for n in (row.get('alternate_names') or '').split(';') if n.strip()]
+        for name in map(normalise, names):
+            place = by_place.get((name, country))
+            if place is None or place[2] < entry[2]:
+                by_place[(name, country)] = entry
+            best = by_name.get(name)
+            if best is None or best[2] < entry[2]:
+                by_name[name] = entry
+    return by_place, by_name
+
+
+def load_index(path=GAZETTEER_FILE, index_file=INDEX_FILE):
+    """Return build_index(path), rebuilt only when the gazetteer file changed."""
+    key = file_key(path)
+    try:
+        with open(index_file, 'rb') as f:
+            version, saved_key, tables = pickle.load(f)
+        if version == INDEX_VERSION and saved_key == key:
+            return tables
+    except (FileNotFoundError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+    tables = build_index(path)
+    os.makedirs(os.path.dirname(os.path.abspath(index_file)), exist_ok=True)
+    with AtomicFile(index_file, 'wb') as f:
+        pickle.dump((INDEX_VERSION, key, tables), f, protocol=pickle.HIGHEST_PROTOCOL)
+    return tables
+
+
+class Geocoder:
+    """
+    Resolves city/country pairs to coordinates from the local gazetteer.
+
+    Answers (including misses) are kept in CACHE_FILE, tagged with the
+    gazetteer they came from, so repeated runs only look up new places.
+    Nothing is fetched over the network.
+    """
+    __slots__ = ('by_place', 'by_name', 'cache', 'cache_file', 'source', 'dirty')
+
+    def __init__(self, gazetteer=GAZETTEER_FILE, index_file=INDEX_FILE, cache_file=CACHE_FILE):
+        self.by_place, self.by_name = load_index(gazetteer, index_file)
+        self.source = list(file_key(gazetteer))
+        self.cache_file = cache_file
+        self.cache = {}
+        self.dirty = False
+        try:
+            with open(cache_file, encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('source') == self.source:
+                self.cache = saved['places']
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+    def resolve(self, city, country=None):
+        """Return (lat, lon) for `city` (in `country`, if given), or None."""
+        key = f"{city}|{country or ''}"
+        if key in self.cache:
+            hit = self.cache[key]
+            return None if hit is None else tuple(hit)
+        name = normalise(city)
+        entry = self.by_place.get((name, normalise(country))) if country else self.by_name.get(name)
+        result = None if entry is None else entry[:2]
+        self.cache[key] = None if result is None else list(result)
+        self.dirty = True
+        return result
+
+    def geocode(self, records):
+        """
+        Fill in missing 'lat'/'lon' of chapter records from 'city'/'country'.
+
+        Yields the records with float coordinates; a record whose place is
+        not in the gazetteer raises LookupError.
+        """
+        for record in records:
+            if record.get('lat') in (None, '') or record.get('lon') in (None, ''):
+                coords = self.resolve(record['city'], record.get('country'))
+                if coords is None:
+                    raise LookupError(f"No gazetteer entry for {record['city']!r}, {record.get('country')!r}")
+                record['lat'], record['lon'] = coords
+            else:
+                record['lat'] = float(record['lat'])
+                record['lon'] = float(record['lon'])
+            yield record
+
+    def save(self):
+        """Write the answer cache if anything was looked up."""
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+        with AtomicFile(self.cache_file) as f:
+            json.dump({'source': self.source, 'places': self.cache}, f, ensure_ascii=False)
+        self.dirty = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fill in missing chapter coordinates from the local gazetteer.')
+    parser.add_argument('chapters', help='chapter CSV/JSONL file')
+    parser.add_argument('--out', help='output file (default: rewrite the input)')
+    parser.add_argument('--gazetteer', default=GAZETTEER_FILE)
+    args = parser.parse_args(argv)
+
+    geocoder = Geocoder(args.gazetteer)
+    try:
+        records = list(geocoder.geocode(iter_records(args.chapters)))
+    except LookupError as exc:
+        parser.exit(1, f"{exc}\n")
+    finally:
+        geocoder.save()
+    count = write_records(args.out or args.chapters, records, CHAPTER_FIELDS)
+    print(f"Wrote {count} chapters with coordinates to '{args.out or args.chapters}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import asyncio
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = 'itsmf-apac-map/1.0'
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_CONCURRENCY = 32
+DEFAULT_PER_HOST = 4
+# Seconds between request starts on one host, so no site sees a burst
+DEFAULT_HOST_INTERVAL = 0.1
+
+# What the coroutines get back; `error` is set (and `status` None) when
+# no response arrived at all
+Response = namedtuple('Response', ['url', 'status', 'headers', 'body', 'final_url', 'elapsed', 'error'])
+
+
+def _short_error(exc):
+    """'ConnectionError (NameResolutionError)' rather than urllib3's full retry message."""
+    cause = re.search(r'Caused by (\w+)', str(exc))
+    return type(exc).__name__ + (f" ({cause.group(1)})" if cause else '')
+
+
+class HttpClient:
+    """
+    Concurrent HTTP client for asyncio code built on one pooled requests.Session.
+
+    Requests run on a thread pool of `concurrency` workers. Each worker
+    reuses kept-alive connections from the session's pool, so a host is
+    connected to once rather than once per URL. At most `per_host`
+    requests run against a host at the same time, with at least
+    `host_interval` seconds between their starts, and every request has
+    a (connect, read) `timeout`. Requests identify themselves with
+    `user_agent`.
+    """
+    __slots__ = ('session', 'timeout', 'per_host', 'host_interval', 'executor',
+                 '_host_locks', '_host_next')
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST,
+                 timeout=DEFAULT_TIMEOUT, host_interval=DEFAULT_HOST_INTERVAL, session=None,
+                 user_agent=USER_AGENT):
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = user_agent
+        self.timeout = timeout
+        self.per_host = per_host
+        self.host_interval = host_interval
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='itsmf-http')
+        self._host_locks = {}
+        self._host_next = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    async def _host_slot(self, host):
+        semaphore = self._host_locks.get(host)
+        if semaphore is None:
+            semaphore = self._host_locks[host] = asyncio.Semaphore(self.per_host)
+        await semaphore.acquire()
+        if self.host_interval:
+            # Space out request starts on this host
+            now = time.monotonic()
+            start = max(now, self._host_next.get(host, now))
+            self._host_next[host] = start + self.host_interval
+            if start > now:
+                await asyncio.sleep(start - now)
+        return semaphore
+
+    def _send(self, method, url, headers, stream):
+        start = time.perf_counter()
+        try:
+            with self.session.request(method, url, headers=headers, timeout=self.timeout,
+                                      allow_redirects=True, stream=stream) as response:
+                # A streamed response is only checked, so its body is never read
+                body = b'' if stream else response.content
+                return Response(url, response.status_code, dict(response.headers), body,
+                                response.url, time.perf_counter() - start, None)
+        except requests.RequestException as exc:
+            return Response(url, None, {}, b'', url, time.perf_counter() - start, _short_error(exc))
+
+    async def request(self, method, url, headers=None, stream=False):
+        """Send one request and return a Response; network errors are returned, not raised."""
+        semaphore = await self._host_slot(urlsplit(url).netloc.lower())
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._send, method, url, headers, stream)
+        finally:
+            semaphore.release()
+
+    async def get(self, url, headers=None):
+        return await self.request('GET', url, headers)
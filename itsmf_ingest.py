@@ -0,0 +1,298 @@
+import argparse
+import asyncio
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import time
+from datetime import date
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+from itsmf_data import CHAPTERS_FILE, EVENT_FIELDS, EVENTS_FILE, AtomicFile, iter_chapters, iter_events, iter_records, write_records
+from itsmf_dates import event_date_ordinal
+from itsmf_http import DEFAULT_CONCURRENCY, DEFAULT_HOST_INTERVAL, DEFAULT_PER_HOST, DEFAULT_TIMEOUT, HttpClient
+
+CACHE_DIR = os.path.join('.itsmf_cache', 'ingest')
+INDEX_FILE = 'pages.json'
+
+# Links that point at a single event page
+EVENT_LINK = re.compile(r'EventDetails\.aspx\?id=\d+|/events?/(?:details/)?[\w-]*\d{4,}', re.IGNORECASE)
+# A date inside free text, in the shapes itsmf_dates understands
+DATE_IN_TEXT = re.compile(
+    r'(?:(?:Mon|Tues|Wednes|Thurs|Fri|Satur|Sun)day,?\s+)?\d{1,2}\s+[A-Z][a-z]{2,8}\.?,?\s+\d{4}'
+    r'|[A-Z][a-z]{2,8}\.?\s+\d{1,2},\s+\d{4}'
+    r'|\d{4}-\d{2}-\d{2}'
+)
+_DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+_MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+           'September', 'October', 'November', 'December')
+# Text chunks on either side of an event link searched for its date
+DATE_WINDOW = 6
+
+
+def format_event_date(ordinal):
+    """Format a date ordinal like the events file: 'Thursday, 11 September 2025'."""
+    d = date.fromordinal(ordinal)
+    return f"{_DAYS[d.weekday()]}, {d.day:02d} {_MONTHS[d.month - 1]} {d.year}"
+
+
+def _parse_date(text):
+    match = DATE_IN_TEXT.search(text or '')
+    if match is None:
+        return None
+    try:
+        return event_date_ordinal(match.group(0))
+    except ValueError:
+        return None
+
+
+class _EventPageParser(HTMLParser):
+    """Collects JSON-LD blocks, text chunks and links of one page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.json_ld = []
+        self.chunks = []
+        self.links = []
+        self._script = None
+        self._link = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'script':
+            self._script = [] if attrs.get('type') == 'application/ld+json' else None
+        elif tag == 'a' and attrs.get('href'):
+            self._link = (attrs['href'], [], len(self.chunks))
+
+    def handle_endtag(self, tag):
+        if tag == 'script' and self._script is not None:
+            self.json_ld.append(''.join(self._script))
+            self._script = None
+        elif tag == 'a' and self._link is not None:
+            href, text, start = self._link
+            # The link's own text is chunks[start:end]
+            self.links.append((href, ' '.join(''.join(text).split()), start, len(self.chunks)))
+            self._link = None
+
+    def handle_data(self, data):
+        if self._script is not None:
+            self._script.append(data)
+            return
+        if self._link is not None:
+            self._link[1].append(data)
+        text = ' '.join(data.split())
+        if text:
+            self.chunks.append(text)
+
+
+def _json_ld_events(blocks, base_url):
+    """Yield (date ordinal, title, link) of schema.org Event objects."""
+    stack = []
+    for block in blocks:
+        try:
+            stack.append(json.loads(block))
+        except ValueError:
+            continue
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(item)
+        elif isinstance(item, dict):
+            stack.extend(item.get('@graph') or [])
+            types = item.get('@type')
+            types = types if isinstance(types, list) else [types]
+            if any(isinstance(t, str) and t.endswith('Event') for t in types) and item.get('name'):
+                ordinal = _parse_date(str(item.get('startDate', ''))[:10])
+                if ordinal is not None:
+                    yield ordinal, html.unescape(item['name']), urljoin(base_url, item.get('url') or base_url)
+
+
+def parse_event_page(page, base_url, country):
+    """
+    Extract events from an HTML page into event records.
+
+    schema.org Event objects in JSON-LD (as published by LinkedIn and most
+    event platforms) are used when present. Otherwise every link to a
+    single event page (e.g. site-ym EventDetails.aspx?id=...) becomes an
+    event, titled by its link text and dated by the nearest date in the
+    text around it. Events whose link is not http(s) are dropped. Records
+    are returned in the events file schema; titles are plain text (they
+    are escaped when rendered).
+    """
+    parser = _EventPageParser()
+    parser.feed(page)
+    parser.close()
+
+    found = list(_json_ld_events(parser.json_ld, base_url))
+    if not found:
+        for href, title, start, end in parser.links:
+            if not title or not EVENT_LINK.search(href):
+                continue
+            ordinal = _parse_date(title)
+            # Nearest date outside the link text, looking after the link
+            # first at each distance (listings usually put it below the title)
+            for offset in range(DATE_WINDOW):
+                for i in (end + offset, start - offset - 1):
+                    if ordinal is None and 0 <= i < len(parser.chunks):
+                        ordinal = _parse_date(parser.chunks[i])
+            if ordinal is not None:
+                found.append((ordinal, title, urljoin(base_url, href)))
+
+    events = {}
+    for ordinal, title, link in found:
+        # Only web links reach the page; javascript:, data: etc. are dropped
+        if urlsplit(link).scheme.lower() not in ('http', 'https'):
+            continue
+        events.setdefault(link, {'country': country, 'date': format_event_date(ordinal),
+                                 'title': title, 'link': link})
+    return list(events.values())
+
+
+class PageCache:
+    """
+    HTTP validators, bodies and parsed events of fetched pages, on disk.
+
+    A page is only downloaded again when the server says it changed
+    (conditional GET with If-None-Match/If-Modified-Since), and it is only
+    parsed again when its body changed.
+    """
+    __slots__ = ('cache_dir', 'pages')
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        try:
+            with open(os.path.join(cache_dir, INDEX_FILE), encoding='utf-8') as f:
+                self.pages = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.pages = {}
+
+    def conditional_headers(self, url):
+        page = self.pages.get(url) or {}
+        headers = {}
+        if page.get('etag'):
+            headers['If-None-Match'] = page['etag']
+        if page.get('last_modified'):
+            headers['If-Modified-Since'] = page['last_modified']
+        return headers
+
+    def has_body(self, url):
+        """Whether the last body of `url` is still on disk (so a 304 can be trusted)."""
+        page = self.pages.get(url)
+        return page is not None and os.path.exists(os.path.join(self.cache_dir, page['sha256'] + '.html'))
+
+    def store(self, url, response, events):
+        digest = hashlib.sha256(response.body).hexdigest()
+        path = os.path.join(self.cache_dir, digest + '.html')
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(response.body)
+        self.pages[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': digest,
+            'events': events,
+            'fetched': time.time(),
+        }
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, INDEX_FILE)
+        with AtomicFile(path) as f:
+            json.dump(self.pages, f, indent=2, ensure_ascii=False)
+
+
+async def ingest_source(client, cache, country, url):
+    """Fetch one events page and return (status, events); status is 'fresh', 'unchanged' or an error."""
+    headers = cache.conditional_headers(url) if cache.has_body(url) else {}
+    response = await client.get(url, headers)
+    if response.status == 304:
+        return 'unchanged', cache.pages[url]['events']
+    if response.error is not None or response.status != 200:
+        return response.error or f"HTTP {response.status}", []
+
+    cached = cache.pages.get(url)
+    if cached is not None and cached['sha256'] == hashlib.sha256(response.body).hexdigest():
+        # Same body without validators: nothing to parse
+        events = cached['events']
+    else:
+        encoding = 'utf-8'
+        match = re.search(r'charset=([\w-]+)', response.headers.get('Content-Type', ''))
+        if match:
+            encoding = match.group(1)
+        try:
+            page = response.body.decode(encoding, errors='replace')
+        except LookupError:
+            # A charset Python does not know: most such pages are UTF-8 anyway
+            page = response.body.decode('utf-8', errors='replace')
+        events = parse_event_page(page, response.final_url, country)
+    os.makedirs(cache.cache_dir, exist_ok=True)
+    cache.store(url, response, events)
+    return 'fresh', events
+
+
+async def ingest_sources(sources, client, cache):
+    """Fetch all (country, url) sources concurrently; return [(country, url, status, events)]."""
+    results = await asyncio.gather(*(ingest_source(client, cache, country, url) for country, url in sources))
+    return [(country, url, status, events) for (country, url), (status, events) in zip(sources, results)]
+
+
+def default_sources(chapters_file=CHAPTERS_FILE):
+    """One source per chapter: its website."""
+    return [(c['country'], c['website']) for c in iter_chapters(chapters_file) if c.get('website')]
+
+
+def merge_events(existing, ingested):
+    """Existing events plus the ingested ones whose link is new, sorted by date."""
+    merged = {}
+    for event in list(existing) + list(ingested):
+        merged.setdefault(event['link'] or (event['country'], event['date'], event['title']), event)
+    return sorted(merged.values(), key=lambda e: event_date_ordinal(e['date']))
+
+
+def run_ingest(sources, cache_dir=CACHE_DIR, concurrency=DEFAULT_CONCURRENCY,
+               per_host=DEFAULT_PER_HOST, timeout=DEFAULT_TIMEOUT, host_interval=DEFAULT_HOST_INTERVAL):
+    """Ingest all sources and persist the page cache; returns ingest_sources' list."""
+    cache = PageCache(cache_dir)
+    with HttpClient(concurrency=concurrency, per_host=per_host, timeout=timeout,
+                    host_interval=host_interval) as client:
+        results = asyncio.run(ingest_sources(sources, client, cache))
+    cache.save()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fetch chapter event pages into the events file.')
+    parser.add_argument('--sources', help="CSV/JSONL with 'country' and 'url' columns (default: chapter websites)")
+    parser.add_argument('--events', default=EVENTS_FILE, help='existing events file to merge into')
+    parser.add_argument('--out', help='output events file (default: --events)')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST)
+    parser.add_argument('--host-interval', type=float, default=DEFAULT_HOST_INTERVAL,
+                        help='seconds between request starts on one host (default %(default)s)')
+    args = parser.parse_args(argv)
+
+    if args.sources:
+        sources = [(row['country'], row['url']) for row in iter_records(args.sources)]
+    else:
+        sources = default_sources()
+    start = time.perf_counter()
+    results = run_ingest(sources, per_host=args.per_host, timeout=args.timeout,
+                         host_interval=args.host_interval)
+
+    ingested = []
+    for country, url, status, events in results:
+        print(f"{status:<12} {len(events):>4} events  {country:<12} {url}")
+        ingested.extend(events)
+    existing = list(iter_events(args.events)) if os.path.exists(args.events) else []
+    merged = merge_events(existing, ingested)
+    write_records(args.out or args.events, merged, EVENT_FIELDS)
+    print(f"{len(merged) - len(existing)} new events; {len(merged)} written to "
+          f"'{args.out or args.events}' in {time.perf_counter() - start:.2f}s")
+    return 1 if any(status not in ('fresh', 'unchanged') for _, _, status, _ in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import json
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+_NULL_STAGE = nullcontext()
+
+
+class NullInstrumentation:
+    """Disabled instrumentation: every stage is the same shared no-op context."""
+    enabled = False
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+class _Stage:
+    __slots__ = ('owner', 'name', 'path', 'wall', 'cpu', 'mem', 'peak')
+
+    def __init__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __enter__(self):
+        owner = self.owner
+        self.path = owner._stack[-1].path + (self.name,) if owner._stack else (self.name,)
+        owner._stack.append(self)
+        self.peak = 0
+        if owner.memory:
+            self.mem = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        owner = self.owner
+        net = peak = 0
+        if owner.memory:
+            current, traced_peak = tracemalloc.get_traced_memory()
+            peak = max(self.peak, traced_peak) - self.mem
+            net = current - self.mem
+            tracemalloc.reset_peak()
+        owner._stack.pop()
+        if owner._stack and owner.memory:
+            # reset_peak() above hides this stage's peak from the parent
+            parent = owner._stack[-1]
+            parent.peak = max(parent.peak, self.mem + peak)
+        owner._record(self.path, wall, cpu, net, peak)
+        return False
+
+
+class Instrumentation:
+    """
+    Records wall time, CPU time and traced memory per named stage.
+
+    Stages nest (`with inst.stage('build'): with inst.stage('markers'):`)
+    and repeated stages are aggregated by their path. With `memory`,
+    tracemalloc is started on first use if it is not already tracing.
+    Pass NULL_INSTRUMENTATION instead to disable all of this at the cost
+    of one method call per stage.
+    """
+    enabled = True
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self._stack = []
+        self._stats = {}
+        self._started_tracemalloc = False
+
+    def stage(self, name):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        return _Stage(self, name)
+
+    def _record(self, path, wall, cpu, net, peak):
+        stats = self._stats.get(path)
+        if stats is None:
+            stats = self._stats[path] = {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                         'net_allocated_bytes': 0, 'peak_allocated_bytes': 0}
+        stats['calls'] += 1
+        stats['wall_seconds'] += wall
+        stats['cpu_seconds'] += cpu
+        stats['net_allocated_bytes'] += net
+        stats['peak_allocated_bytes'] = max(stats['peak_allocated_bytes'], peak)
+
+    def close(self):
+        """Stop tracemalloc if this object started it."""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def report(self):
+        """Return the recorded stages as a JSON-serialisable dict."""
+        stages = []
+        for path, stats in self._stats.items():
+            stages.append(dict(
+                stage='/'.join(path),
+                depth=len(path) - 1,
+                calls=stats['calls'],
+                wall_seconds=round(stats['wall_seconds'], 6),
+                cpu_seconds=round(stats['cpu_seconds'], 6),
+                net_allocated_bytes=stats['net_allocated_bytes'] if self.memory else None,
+                peak_allocated_bytes=stats['peak_allocated_bytes'] if self.memory else None,
+            ))
+        # Parents before children, in first-seen order
+        order = {path: i for i, path in enumerate(self._stats)}
+        stages.sort(key=lambda s: [order.get(tuple(s['stage'].split('/')[:n + 1]), 0)
+                                   for n in range(s['depth'] + 1)])
+        total = sum(stats['wall_seconds'] for path, stats in self._stats.items() if len(path) == 1)
+        return {'total_wall_seconds': round(total, 6), 'stages': stages}
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def collapsed_stacks(self):
+        """
+        Return the stages in folded-stack format ('a;b;c <microseconds>' per line).
+
+        Each line carries the stage's self time (its wall time minus its
+        children's), which flamegraph.pl, speedscope and similar tools
+        render as a flame graph.
+        """
+        child_time = {}
+        for path, stats in self._stats.items():
+            if len(path) > 1:
+                child_time[path[:-1]] = child_time.get(path[:-1], 0.0) + stats['wall_seconds']
+        lines = []
+        for path, stats in self._stats.items():
+            self_time = max(0.0, stats['wall_seconds'] - child_time.get(path, 0.0))
+            lines.append(f"{';'.join(path)} {round(self_time * 1e6)}")
+        return '\n'.join(lines) + '\n'
+
+    def write_collapsed(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.collapsed_stacks())
@@ -0,0 +1,276 @@
+import json
+
+from branca.element import MacroElement
+from jinja2 import Template
+
+
+def compact_json(value):
+    """JSON without optional whitespace, safe to embed inside a <script> block."""
+    return (json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+            .replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026'))
+
+
+class ChapterGeoJson(MacroElement):
+    """
+    All chapters as one GeoJSON FeatureCollection.
+
+    Each chapter costs one compact feature (coordinates plus its text
+    fields). Colours come from one country->colour table, and the style,
+    tooltip and popup are single client-side functions driven by the
+    feature properties, so nothing is repeated per chapter. Points are
+    drawn as circle markers on a canvas renderer.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function () {
+                var colors = {{ this.colors_json }};
+                var labels = {{ this.labels_json }};
+                var data = {type: 'FeatureCollection', features: {{ this.features_json }}};
+                var renderer = L.canvas();
+
+                function esc(s) {
+                    return String(s).replace(/[&<>"']/g, function (c) {
+                        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+                    });
+                }
+                function style(feature) {
+                    return {
+                        renderer: renderer, radius: 7, weight: 1, color: '#333',
+                        fillColor: colors[feature.properties.country] || 'gray', fillOpacity: 0.9
+                    };
+                }
+                function popup(layer) {
+                    var p = layer.feature.properties;
+                    return '<div class="itsmf-popup"><h4>' + esc(p.chapter) + '</h4>' +
+                        '<p><strong>' + labels.location + ':</strong> ' + esc(p.city) + ', ' + esc(p.country) + '</p>' +
+                        '<p><strong>' + labels.details + ':</strong> ' + esc(p.details) + '</p>' +
+                        '<p><strong>' + labels.website + ':</strong> <a href="' + esc(p.website) +
+                        '" target="_blank">' + esc(p.website) + '</a></p></div>';
+                }
+                function tooltip(layer) {
+                    var p = layer.feature.properties;
+                    return esc(p.chapter + ' - ' + p.city);
+                }
+
+                return L.geoJson(data, {
+                    pointToLayer: function (feature, latlng) {
+                        return L.circleMarker(latlng, style(feature));
+                    },
+                    onEachFeature: function (feature, layer) {
+                        layer.bindPopup(popup, {maxWidth: 280});
+                        layer.bindTooltip(tooltip);
+                    }
+                }).addTo({{ this._parent.get_name() }});
+            })();
+        {% endmacro %}
+        """)
+
+    def __init__(self, country_colors, labels, features_placeholder=None):
+        super().__init__()
+        self._name = 'ChapterGeoJson'
+        self.country_colors = country_colors
+        self.labels = labels
+        # Rendered in place of the features, for writers that stream them in later
+        self.features_placeholder = features_placeholder
+        self._features = []
+
+    def add_columns(self, columns):
+        """Append every chapter of an itsmf_columns.ChapterColumns."""
+        self._features.extend(map(feature_json, columns.lat, columns.lon, columns.chapter, columns.city,
+                                  columns.country, columns.details, columns.website))
+
+    def __len__(self):
+        return len(self._features)
+
+    @property
+    def colors_json(self):
+        return compact_json(self.country_colors)
+
+    @property
+    def labels_json(self):
+        return compact_json({key: self.labels[key] for key in ('location', 'details', 'website')})
+
+    @property
+    def features_json(self):
+        if self.features_placeholder is not None:
+            return '[' + self.features_placeholder + ']'
+        return '[' + ','.join(self._features) + ']'
+
+
+def feature_json(lat, lon, chapter, city, country, details, website):
+    """Serialise one chapter, given as its fields, as a compact GeoJSON point feature."""
+    return compact_json({
+        'type': 'Feature',
+        'geometry': {
+            'type': 'Point',
+            'coordinates': [round(lon, 5), round(lat, 5)],
+        },
+        'properties': {
+            'chapter': chapter,
+            'city': city,
+            'country': country,
+            'details': details,
+            'website': website,
+        },
+    })
+
+
+def chapter_feature_json(chapter):
+    """Serialise one chapter record as a compact GeoJSON point feature."""
+    return feature_json(chapter['lat'], chapter['lon'], chapter['chapter'], chapter['city'],
+                        chapter['country'], chapter['details'], chapter['website'])
+
+
+class NearestChapterLookup(MacroElement):
+    """
+    Click anywhere on the map to see the nearest chapter and its distance.
+
+    Ships the coordinates and names of an itsmf_spatial.ChapterIndex and
+    runs the same query in the browser: the chapter with the largest dot
+    product of unit vectors is the nearest by great-circle distance.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            (function () {
+                var data = {{ this.data_json }};
+                var rad = Math.PI / 180, xyz = [];
+                function esc(s) {
+                    return String(s).replace(/[&<>"']/g, function (c) {
+                        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+                    });
+                }
+                for (var i = 0; i < data.lat.length; i++) {
+                    var c = Math.cos(data.lat[i] * rad);
+                    xyz.push([c * Math.cos(data.lon[i] * rad), c * Math.sin(data.lon[i] * rad), Math.sin(data.lat[i] * rad)]);
+                }
+                {{ this._parent.get_name() }}.on('click', function (e) {
+                    if (!xyz.length) { return; }
+                    var c = Math.cos(e.latlng.lat * rad);
+                    var p = [c * Math.cos(e.latlng.lng * rad), c * Math.sin(e.latlng.lng * rad), Math.sin(e.latlng.lat * rad)];
+                    var best = 0, bestDot = -2;
+                    for (var i = 0; i < xyz.length; i++) {
+                        var dot = p[0] * xyz[i][0] + p[1] * xyz[i][1] + p[2] * xyz[i][2];
+                        if (dot > bestDot) { bestDot = dot; best = i; }
+                    }
+                    var chord = Math.sqrt(Math.max(0, 2 - 2 * bestDot));
+                    var km = 2 * {{ this.radius_km }} * Math.asin(Math.min(1, chord / 2));
+                    L.popup().setLatLng(e.latlng).setContent(
+                        '<div class="itsmf-popup"><strong>' + data.label + ':</strong> ' + esc(data.names[best]) +
+                        '<br>' + Math.round(km).toLocaleString() + ' km</div>'
+                    ).openOn({{ this._parent.get_name() }});
+                });
+            })();
+        {% endmacro %}
+        """)
+
+    def __init__(self, index, label, data_placeholder=None):
+        super().__init__()
+        self._name = 'NearestChapterLookup'
+        self.index = index
+        self.label = label
+        # Rendered in place of the data, for writers that stream the chapters in later
+        self.data_placeholder = data_placeholder
+
+    @property
+    def radius_km(self):
+        from itsmf_spatial import EARTH_RADIUS_KM
+
+        return EARTH_RADIUS_KM
+
+    @property
+    def data_json(self):
+        if self.data_placeholder is not None:
+            return self.data_placeholder
+        return nearest_lookup_json(self.index.lat, self.index.lon,
+                                   [f"{c['chapter']} ({c['city']})" for c in self.index.chapters], self.label)
+
+
+def nearest_lookup_json(lat, lon, names, label):
+    """Serialise the chapter coordinates and names shipped by NearestChapterLookup."""
+    return compact_json({
+        'lat': [round(float(v), 5) for v in lat],
+        'lon': [round(float(v), 5) for v in lon],
+        'names': names,
+        'label': label,
+    })
+
+
+class RegionShards(MacroElement):
+    """
+    Loads per-region chapter shards when the view first reaches a region.
+
+    Each shard (see itsmf_regions.write_shards) is a script that calls
+    window.itsmfShard with rows in the fast_cluster layout. On load and
+    after every pan or zoom, the shards of regions whose bounds intersect
+    the view are injected once; their chapters are drawn as circle markers
+    on one shared canvas renderer.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            (function () {
+                var map = {{ this._parent.get_name() }};
+                var shards = {{ this.shards_json }};
+                var labels = {{ this.labels_json }};
+                var renderer = L.canvas(), requested = {};
+
+                function esc(s) {
+                    return String(s).replace(/[&<>"']/g, function (c) {
+                        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+                    });
+                }
+
+                window.itsmfShard = function (name, rows) {
+                    for (var i = 0; i < rows.length; i++) {
+                        var row = rows[i];
+                        L.circleMarker([row[0], row[1]], {
+                            renderer: renderer, radius: 7, weight: 1, color: '#333',
+                            fillColor: row[2], fillOpacity: 0.9
+                        }).bindTooltip(esc(row[3] + ' - ' + row[4])).bindPopup(
+                            '<div class="itsmf-popup"><h4>' + esc(row[3]) + '</h4>' +
+                            '<p><strong>' + labels.location + ':</strong> ' + esc(row[4]) + ', ' + esc(row[5]) + '</p>' +
+                            '<p><strong>' + labels.details + ':</strong> ' + esc(row[6]) + '</p>' +
+                            '<p><strong>' + labels.website + ':</strong> <a href="' + esc(row[7]) +
+                            '" target="_blank">' + esc(row[7]) + '</a></p></div>',
+                            {maxWidth: 280}
+                        ).addTo(map);
+                    }
+                };
+
+                function loadVisible() {
+                    var view = map.getBounds();
+                    for (var i = 0; i < shards.length; i++) {
+                        var shard = shards[i];
+                        if (requested[shard.name] || !view.intersects(L.latLngBounds(shard.bounds))) {
+                            continue;
+                        }
+                        requested[shard.name] = true;
+                        var script = document.createElement('script');
+                        script.src = shard.url;
+                        script.async = true;
+                        document.head.appendChild(script);
+                    }
+                }
+                map.on('moveend zoomend', loadVisible);
+                loadVisible();
+            })();
+        {% endmacro %}
+        """)
+
+    def __init__(self, regions, urls, labels):
+        super().__init__()
+        self._name = 'RegionShards'
+        self.regions = regions
+        self.urls = urls
+        self.labels = labels
+
+    @property
+    def shards_json(self):
+        shards = []
+        for name, url in self.urls.items():
+            south, west, north, east = self.regions[name].bounds
+            shards.append({'name': name, 'url': url, 'bounds': [[south, west], [north, east]]})
+        return compact_json(shards)
+
+    @property
+    def labels_json(self):
+        return compact_json({key: self.labels[key] for key in ('location', 'details', 'website')})
@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from itsmf_data import CHAPTERS_FILE, EVENTS_FILE, AtomicFile, iter_chapters, iter_events
+from itsmf_http import DEFAULT_CONCURRENCY, DEFAULT_HOST_INTERVAL, DEFAULT_PER_HOST, DEFAULT_TIMEOUT, HttpClient
+
+CACHE_FILE = os.path.join('.itsmf_cache', 'links.json')
+# Results younger than this are not checked again
+DEFAULT_TTL = 24 * 3600
+
+# Statuses of sites that refuse automated clients (LinkedIn answers 999)
+# rather than of missing pages; reported, but not as broken
+BLOCKED_STATUSES = {401, 403, 429, 999}
+# Servers that do not implement HEAD properly; retried with GET
+HEAD_UNSUPPORTED = {400, 403, 405, 501}
+
+
+def collect_links(chapters, events):
+    """Map every chapter website and event link to where it is used."""
+    links = {}
+    for chapter in chapters:
+        if chapter.get('website'):
+            links.setdefault(chapter['website'], []).append(f"chapter {chapter['chapter']!r} website")
+    for event in events:
+        if event.get('link'):
+            links.setdefault(event['link'], []).append(f"event {event['title']!r} link")
+    return links
+
+
+def classify(status, error):
+    if error is not None or status is None:
+        return 'broken'
+    if status < 400:
+        return 'ok'
+    if status in BLOCKED_STATUSES:
+        return 'blocked'
+    return 'broken'
+
+
+def load_cache(path=CACHE_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_cache(results, path=CACHE_FILE):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with AtomicFile(path) as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+async def check_link(client, url):
+    """Check one URL with HEAD (falling back to GET) and return its result dict."""
+    response = await client.request('HEAD', url, stream=True)
+    if response.status in HEAD_UNSUPPORTED:
+        response = await client.request('GET', url, stream=True)
+    return {
+        'state': classify(response.status, response.error),
+        'status': response.status,
+        'final_url': response.final_url,
+        'error': response.error,
+        'seconds': round(response.elapsed, 3),
+        'checked': time.time(),
+    }
+
+
+async def check_links(urls, client, cache=None, ttl=DEFAULT_TTL, now=None):
+    """
+    Check `urls` concurrently and return {url: result}.
+
+    Working (and blocked) results in `cache` checked less than `ttl`
+    seconds ago are reused as they are; broken links are always checked
+    again, so a fixed link or a host that was briefly down does not stay
+    reported. Every other URL is requested at once, and the client's
+    pool and per-host limits decide how many run in parallel.
+    """
+    cache = cache or {}
+    now = time.time() if now is None else now
+    results = {}
+    pending = []
+    for url in urls:
+        cached = cache.get(url)
+        if cached is not None and cached['state'] != 'broken' and now - cached['checked'] < ttl:
+            results[url] = cached
+        else:
+            pending.append(url)
+    for url, result in zip(pending, await asyncio.gather(*(check_link(client, url) for url in pending))):
+        results[url] = result
+    return results
+
+
+def run_check(chapters=None, events=None, cache_file=CACHE_FILE, ttl=DEFAULT_TTL,
+              concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST, timeout=DEFAULT_TIMEOUT,
+              host_interval=DEFAULT_HOST_INTERVAL):
+    """
+    Check every chapter website and event link, updating the result cache.
+
+    Returns (links, results) where `links` maps each URL to its uses.
+    """
+    if chapters is None:
+        chapters = iter_chapters(CHAPTERS_FILE)
+    if events is None:
+        events = iter_events(EVENTS_FILE)
+    links = collect_links(chapters, events)
+    cache = load_cache(cache_file)
+    with HttpClient(concurrency=concurrency, per_host=per_host, timeout=timeout,
+                    host_interval=host_interval) as client:
+        results = asyncio.run(check_links(links, client, cache, ttl))
+    cache.update(results)
+    save_cache(cache, cache_file)
+    return links, results
+
+
+def format_results(links, results, verbose=False):
+    """Return a report listing broken (and, with `verbose`, all other) links."""
+    lines = []
+    counts = {}
+    for url in sorted(links):
+        result = results[url]
+        counts[result['state']] = counts.get(result['state'], 0) + 1
+        if result['state'] == 'ok' and not verbose:
+            continue
+        detail = result['error'] or f"HTTP {result['status']}"
+        lines.append(f"{result['state'].upper():<8} {detail:<12} {url}")
+        for use in links[url]:
+            lines.append(f"         used by {use}")
+    summary = ', '.join(f"{counts[state]} {state}" for state in ('ok', 'blocked', 'broken') if state in counts)
+    lines.append(f"{len(links)} links checked: {summary or 'none'}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check chapter websites and event links.')
+    parser.add_argument('--chapters', default=CHAPTERS_FILE)
+    parser.add_argument('--events', default=EVENTS_FILE)
+    parser.add_argument('--ttl', type=float, default=DEFAULT_TTL, help='seconds a result stays valid (0 = recheck all)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST)
+    parser.add_argument('--host-interval', type=float, default=DEFAULT_HOST_INTERVAL,
+                        help='seconds between request starts on one host (default %(default)s)')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument('--verbose', action='store_true', help='also list working links')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    links, results = run_check(iter_chapters(args.chapters), iter_events(args.events), ttl=args.ttl,
+                               concurrency=args.concurrency, per_host=args.per_host, timeout=args.timeout,
+                               host_interval=args.host_interval)
+    print(format_results(links, results, args.verbose))
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+    return 1 if any(r['state'] == 'broken' for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
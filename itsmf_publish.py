@@ -0,0 +1,157 @@
+import gzip
+import os
+import re
+
+from itsmf_data import write_atomic
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only .gz is written
+    brotli = None
+
+# Tags around which whitespace never matters for rendering
+_BLOCK_TAGS = ('html|head|body|meta|link|script|style|title|div|p|h[1-6]|hr|br|ul|ol|li|'
+               'table|thead|tbody|tr|td|th|iframe|noscript|!DOCTYPE')
+
+_RAW_BLOCK = re.compile(r'(<(script|style|pre|textarea)\b[^>]*>)(.*?)(</\2\s*>)', re.S | re.I)
+_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.S)
+_WHITESPACE = re.compile(r'\s+')
+_AROUND_BLOCK = re.compile(rf'\s*(</?(?:{_BLOCK_TAGS})\b[^>]*>)\s*', re.I)
+_STYLE_ATTR = re.compile(r'''\bstyle=(["'])(.*?)\1''', re.S | re.I)
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+# Whitespace around ':' is only removed inside declaration blocks: in a selector,
+# 'a :hover' and 'a:hover' match different elements
+_CSS_BLOCK = re.compile(r'\{[^{}]*\}')
+_CSS_COLON = re.compile(r'\s*:\s*')
+
+# Precompressed siblings written next to a published file
+PRECOMPRESSED_SUFFIXES = ('.gz', '.br')
+
+
+def minify_css(css):
+    """Strip comments and optional whitespace from a stylesheet or declaration list."""
+    css = _CSS_COMMENT.sub('', css)
+    css = _WHITESPACE.sub(' ', css)
+    css = _CSS_PUNCTUATION.sub(r'\1', css)
+    if '{' in css:
+        css = _CSS_BLOCK.sub(lambda m: _CSS_COLON.sub(':', m.group(0)), css)
+    else:
+        css = _CSS_COLON.sub(':', css)
+    return css.replace(';}', '}').strip().rstrip(';')
+
+
+def minify_js(js):
+    """
+    Trim indentation and blank lines from a script.
+
+    Deliberately conservative: line breaks and comments are kept, so
+    automatic semicolon insertion and string/regex literals are never
+    affected.
+    """
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def minify_html(html):
+    """Collapse whitespace, drop comments and tighten inline CSS in a generated page."""
+    preserved = []
+
+    def keep(match):
+        open_tag, tag, body, close_tag = match.groups()
+        tag = tag.lower()
+        if tag == 'script':
+            body = minify_js(body)
+        elif tag == 'style':
+            body = minify_css(body)
+        preserved.append(open_tag + body + close_tag)
+        return f"\x00{len(preserved) - 1}\x00"
+
+    html = _RAW_BLOCK.sub(keep, html)
+    html = _COMMENT.sub('', html)
+    html = _STYLE_ATTR.sub(lambda m: f'style="{minify_css(m.group(2))}"', html)
+    html = _WHITESPACE.sub(' ', html)
+    html = _AROUND_BLOCK.sub(r'\1', html)
+    html = re.sub(r'\s*(\x00\d+\x00)\s*', r'\1', html)
+    return re.sub(r'\x00(\d+)\x00', lambda m: preserved[int(m.group(1))], html).strip()
+
+
+def precompress(path):
+    """Write `path`.gz and, if brotli is installed, `path`.br at maximum compression."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    outputs = {}
+    # mtime=0 keeps the .gz byte-identical across builds of the same content
+    write_atomic(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    outputs['gz'] = path + '.gz'
+    if brotli is not None:
+        mode = brotli.MODE_TEXT if path.endswith(('.html', '.css', '.js', '.json', '.md')) else brotli.MODE_GENERIC
+        write_atomic(path + '.br', brotli.compress(data, quality=11, mode=mode))
+        outputs['br'] = path + '.br'
+    else:
+        # A .br left from a build with brotli would be served for stale content
+        _remove(path + '.br')
+    return outputs
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_precompressed(path):
+    """Delete the .gz/.br siblings of `path`, so servers fall back to the file itself."""
+    for suffix in PRECOMPRESSED_SUFFIXES:
+        _remove(path + suffix)
+
+
+_MINIFIERS = {'.html': minify_html, '.htm': minify_html, '.css': minify_css, '.js': minify_js}
+
+
+def publish(path, minify=True):
+    """
+    Minify `path` in place (HTML, CSS or JS) and write precompressed siblings.
+
+    Returns a size report: {'file', 'original', 'minified', 'gz', 'br'}
+    in bytes ('br' is None when brotli is not installed).
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    report = {'file': path, 'original': len(data)}
+
+    minifier = _MINIFIERS.get(os.path.splitext(path)[1].lower())
+    if minify and minifier is not None:
+        minified = minifier(data.decode('utf-8')).encode('utf-8')
+        if len(minified) < len(data):
+            write_atomic(path, minified)
+            data = minified
+    report['minified'] = len(data)
+
+    outputs = precompress(path)
+    report['gz'] = os.path.getsize(outputs['gz'])
+    report['br'] = os.path.getsize(outputs['br']) if 'br' in outputs else None
+    return report
+
+
+def format_report(reports):
+    """Format publish() reports as a before/after size table."""
+    lines = [f"{'file':<40} {'original':>10} {'minified':>10} {'gzip':>10} {'brotli':>10}"]
+    for r in reports:
+        br = '-' if r['br'] is None else r['br']
+        lines.append(f"{r['file']:<40} {r['original']:>10} {r['minified']:>10} {r['gz']:>10} {br:>10}")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Minify generated pages and write .gz/.br siblings')
+    parser.add_argument('files', nargs='+', help='HTML/CSS/JS files to publish')
+    parser.add_argument('--no-minify', action='store_true', help='only precompress')
+    args = parser.parse_args()
+
+    print(format_report([publish(path, minify=not args.no_minify) for path in args.files]))
+    if brotli is None:
+        print("\nbrotli is not installed; only .gz files were written")
@@ -0,0 +1,149 @@
+import hashlib
+import os
+from collections import namedtuple
+
+from itsmf_data import COUNTRY_COLORS, DEFAULT_COLOR, write_atomic
+
+# One ITSMF region: where the map opens for it, the (south, west, north,
+# east) box its shard covers, and the countries assigned to it by name.
+# Chapters in other countries are assigned by their coordinates.
+Region = namedtuple('Region', ['name', 'title', 'center', 'zoom', 'bounds', 'countries'])
+
+REGIONS = {
+    'apac': Region('apac', 'Asia-Pacific', (15.0, 120.0), 3, (-50.0, 60.0, 55.0, 180.0),
+                   ('India', 'Malaysia', 'Thailand', 'Hong Kong', 'Australia', 'New Zealand',
+                    'Singapore', 'Indonesia', 'Philippines', 'Vietnam', 'Japan', 'South Korea',
+                    'China', 'Taiwan', 'Sri Lanka', 'Bangladesh', 'Pakistan', 'Nepal')),
+    'emea': Region('emea', 'Europe, Middle East and Africa', (30.0, 20.0), 3, (-40.0, -25.0, 72.0, 60.0),
+                   ('United Kingdom', 'Ireland', 'Germany', 'France', 'Netherlands', 'Belgium',
+                    'Switzerland', 'Spain', 'Italy', 'Sweden', 'Norway', 'Denmark', 'Finland',
+                    'Poland', 'South Africa', 'United Arab Emirates', 'Saudi Arabia', 'Israel')),
+    'americas': Region('americas', 'Americas', (15.0, -85.0), 3, (-60.0, -170.0, 75.0, -30.0),
+                       ('United States', 'Canada', 'Mexico', 'Brazil', 'Argentina', 'Chile',
+                        'Colombia', 'Peru')),
+}
+DEFAULT_REGION = 'apac'
+
+SHARD_DIR = 'shards'
+
+
+def get_region(region):
+    """Return the Region for a name (or a Region itself)."""
+    if isinstance(region, Region):
+        return region
+    try:
+        return REGIONS[region]
+    except KeyError:
+        raise ValueError(f"Unknown region: {region!r}") from None
+
+
+def region_of(chapter, regions=REGIONS):
+    """Name of the region a chapter belongs to, by country or else by coordinates."""
+    for region in regions.values():
+        if chapter['country'] in region.countries:
+            return region.name
+    for region in regions.values():
+        south, west, north, east = region.bounds
+        if south <= chapter['lat'] <= north and west <= chapter['lon'] <= east:
+            return region.name
+    return None
+
+
+def shard_rows(chapters, country_colors=COUNTRY_COLORS, regions=REGIONS):
+    """
+    Group chapters into per-region marker rows in one pass.
+
+    Rows use the fast_cluster layout [lat, lon, color, chapter, city,
+    country, details, website]. Chapters outside every region are
+    skipped. Returns {region name: [row, ...]}.
+    """
+    rows = {name: [] for name in regions}
+    for chapter in chapters:
+        name = region_of(chapter, regions)
+        if name is None:
+            continue
+        rows[name].append([
+            round(chapter['lat'], 5), round(chapter['lon'], 5),
+            country_colors.get(chapter['country'], DEFAULT_COLOR), chapter['chapter'],
+            chapter['city'], chapter['country'], chapter['details'], chapter['website'],
+        ])
+    return rows
+
+
+def write_shards(out_dir, rows, shard_dir=SHARD_DIR):
+    """
+    Write one script per region that hands its rows to the page.
+
+    Shards are plain scripts calling window.itsmfShard(name, rows), so
+    they load from file:// as well as over HTTP. Returns {region name:
+    relative URL} for the non-empty regions, with a content hash in the query so browsers can
+    cache shards indefinitely.
+    """
+    from itsmf_layers import compact_json
+
+    os.makedirs(os.path.join(out_dir, shard_dir), exist_ok=True)
+    urls = {}
+    for name, region_rows in rows.items():
+        if not region_rows:
+            continue
+        script = f"window.itsmfShard({compact_json(name)},{compact_json(region_rows)});\n"
+        data = script.encode('utf-8')
+        path = os.path.join(out_dir, shard_dir, f"{name}.js")
+        write_atomic(path, data)
+        urls[name] = f"{shard_dir}/{name}.js?v={hashlib.sha256(data).hexdigest()[:12]}"
+    return urls
+
+
+def write_sharded_map(output_file, chapters=None, events=None, region=DEFAULT_REGION,
+                      country_colors=None, regions=REGIONS, vendor=False, inline_critical=False,
+                      publish=False, **map_options):
+    """
+    Write a region-sharded map: a light shell page plus one shard per region.
+
+    The shell holds the page furniture, the event list and one line per
+    region in the legend, but no chapters. In the browser, a region's
+    shard is loaded the first time the view overlaps that region's
+    bounds, so the page opened on `region` loads that region's shard and
+    nothing more. Returns {region name: chapter count}.
+
+    `vendor`, `inline_critical` and `publish` work as for
+    itsmf_build_cache.build_map_html; with `publish`, the shards are
+    precompressed too.
+    """
+    import itsmf_chapter_apac_v3 as builder
+    from itsmf_data import CHAPTERS_FILE, iter_chapters
+    from itsmf_layers import RegionShards
+    from itsmf_publish import minify_html, precompress, remove_precompressed
+
+    if chapters is None:
+        chapters = iter_chapters(CHAPTERS_FILE)
+    country_colors = country_colors or COUNTRY_COLORS
+    out_dir = os.path.dirname(os.path.abspath(output_file))
+    rows = shard_rows(chapters, country_colors, regions)
+    urls = write_shards(out_dir, rows)
+
+    labels = builder.LABELS[map_options.get('language', 'en')]
+    region_list = ''.join(
+        f'<div class="itsmf-legend-row"><strong>{regions[name].title}:</strong> '
+        f'{len(region_rows)} {labels["legend_chapters"]}</div>'
+        for name, region_rows in rows.items() if region_rows
+    )
+    m = builder.create_itsmf_apac_map([], events, country_colors=country_colors, region=region,
+                                      render_mode='markers', chapter_list_html=region_list,
+                                      out_dir=out_dir, **map_options)
+    RegionShards(regions, urls, labels).add_to(m)
+    if vendor:
+        from itsmf_vendor import vendor_assets
+
+        vendor_assets(m, out_dir=out_dir, inline_critical=inline_critical)
+    html = m.get_root().render()
+    if publish:
+        html = minify_html(html)
+    write_atomic(output_file, html)
+
+    for path in [output_file] + [os.path.join(out_dir, url.split('?')[0]) for url in urls.values()]:
+        if publish:
+            precompress(path)
+        else:
+            remove_precompressed(path)
+    return {name: len(region_rows) for name, region_rows in rows.items()}
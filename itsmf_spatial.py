@@ -0,0 +1,126 @@
+import numpy as np
+
+# Mean Earth radius (IUGG), in km
+EARTH_RADIUS_KM = 6371.0088
+# Distance matrix entries computed at once by the batch queries; a block
+# this size (512 KB of float64) stays in cache, which is several times
+# faster than larger blocks
+CHUNK_ELEMENTS = 1 << 16
+
+
+def unit_vectors(lat, lon):
+    """Return the (n, 3) unit vectors of points given in degrees."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _distance_km(dot):
+    """Great-circle distance from the dot product of two unit vectors."""
+    # The chord form stays accurate for nearby points, where arccos(dot) does not
+    chord = np.sqrt(np.maximum(0.0, 2.0 - 2.0 * dot))
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, chord / 2.0))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between points given in degrees (broadcasts)."""
+    return _distance_km(np.sum(unit_vectors(lat1, lon1) * unit_vectors(lat2, lon2), axis=-1))
+
+
+class ChapterIndex:
+    """
+    Chapter coordinates as unit vectors for nearest-chapter queries.
+
+    On the unit sphere the great-circle distance only grows as the dot
+    product shrinks, so the nearest chapters are the largest entries of
+    one matrix product. Batch queries process the points in chunks of
+    CHUNK_ELEMENTS distances, which keeps memory flat for millions of
+    points.
+    """
+    __slots__ = ('chapters', 'lat', 'lon', 'xyz')
+
+    def __init__(self, chapters, lat, lon):
+        self.chapters = chapters
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.xyz = unit_vectors(self.lat, self.lon)
+
+    @classmethod
+    def build(cls, chapters):
+        """Index an iterable of chapter records (with float 'lat'/'lon')."""
+        chapters = list(chapters)
+        return cls(chapters, [c['lat'] for c in chapters], [c['lon'] for c in chapters])
+
+    def __len__(self):
+        return len(self.chapters)
+
+    def nearest_batch(self, lat, lon, k=1):
+        """
+        Return (indices, distances_km) of the `k` nearest chapters per point.
+
+        `lat`/`lon` are equal-length arrays in degrees; both results have
+        shape (len(lat), k), nearest first.
+        """
+        points = unit_vectors(np.atleast_1d(lat), np.atleast_1d(lon))
+        k = min(k, len(self))
+        indices = np.empty((len(points), k), dtype=np.int64)
+        distances = np.empty((len(points), k), dtype=np.float64)
+        step = max(1, CHUNK_ELEMENTS // max(1, len(self)))
+        xyz_t = np.ascontiguousarray(self.xyz.T)
+        for start in range(0, len(points), step):
+            dots = points[start:start + step] @ xyz_t
+            if k == 1:
+                top = np.argmax(dots, axis=1)[:, None]
+            elif k < len(self):
+                top = np.argpartition(-dots, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(k), (len(dots), k))
+            top_dots = np.take_along_axis(dots, top, axis=1)
+            order = np.argsort(-top_dots, axis=1, kind='stable')
+            indices[start:start + step] = np.take_along_axis(top, order, axis=1)
+            distances[start:start + step] = _distance_km(np.take_along_axis(top_dots, order, axis=1))
+        return indices, distances
+
+    def nearest(self, lat, lon, k=1):
+        """Return [(chapter, distance_km), ...] for the `k` chapters nearest one point."""
+        indices, distances = self.nearest_batch([lat], [lon], k)
+        return [(self.chapters[i], float(d)) for i, d in zip(indices[0], distances[0])]
+
+    def within(self, lat, lon, radius_km):
+        """Return [(chapter, distance_km), ...] within `radius_km` of a point, nearest first."""
+        distances = _distance_km(self.xyz @ unit_vectors(lat, lon))
+        hits = np.flatnonzero(distances <= radius_km)
+        hits = hits[np.argsort(distances[hits], kind='stable')]
+        return [(self.chapters[i], float(distances[i])) for i in hits]
+
+    def within_batch(self, lat, lon, radius_km):
+        """
+        Return (point_index, chapter_index, distance_km) arrays of all pairs within `radius_km`.
+
+        Pairs are ordered by point, then by chapter.
+        """
+        points = unit_vectors(np.atleast_1d(lat), np.atleast_1d(lon))
+        # Compare dot products against the radius instead of converting every entry
+        min_dot = np.cos(min(np.pi, radius_km / EARTH_RADIUS_KM))
+        step = max(1, CHUNK_ELEMENTS // max(1, len(self)))
+        xyz_t = np.ascontiguousarray(self.xyz.T)
+        point_parts, chapter_parts, distance_parts = [], [], []
+        for start in range(0, len(points), step):
+            dots = points[start:start + step] @ xyz_t
+            rows, cols = np.nonzero(dots >= min_dot)
+            point_parts.append(rows + start)
+            chapter_parts.append(cols)
+            distance_parts.append(_distance_km(dots[rows, cols]))
+        if not point_parts:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+        return np.concatenate(point_parts), np.concatenate(chapter_parts), np.concatenate(distance_parts)
+
+    def assign(self, lat, lon, max_km=None):
+        """Return the nearest chapter index per point, or -1 when it is farther than `max_km`."""
+        indices, distances = self.nearest_batch(lat, lon, 1)
+        nearest = indices[:, 0]
+        if max_km is not None:
+            nearest = np.where(distances[:, 0] <= max_km, nearest, -1)
+        return nearest
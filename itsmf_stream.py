@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+
+import itsmf_chapter_apac_v3 as builder
+from itsmf_data import AtomicFile, CHAPTERS_FILE, DEFAULT_COLOR, EVENTS_FILE, iter_chapters, iter_events
+from itsmf_dates import SortedEvents, sort_events
+from itsmf_event_index import EventIndex
+from itsmf_layers import ChapterGeoJson, NearestChapterLookup, chapter_feature_json, nearest_lookup_json
+from itsmf_templates import LEGEND_ROW_TEMPLATE, fragment_template
+
+# Stand-ins for the streamed parts in the rendered page shell, in page order
+CHAPTER_LIST_PLACEHOLDER = '<!-- itsmf:chapter-list -->'
+EVENT_LIST_PLACEHOLDER = '<!-- itsmf:event-list -->'
+FEATURES_PLACEHOLDER = '/* itsmf:features */'
+LOOKUP_PLACEHOLDER = '/* itsmf:nearest-lookup */'
+
+# Flush the spooled marker features to disk past this many bytes
+SPOOL_MAX_SIZE = 1 << 20
+
+
+def render_shell(country_colors=None, language='en', nearest_lookup=False, **map_options):
+    """
+    Render the page without any chapters or events.
+
+    The result holds CHAPTER_LIST_PLACEHOLDER, EVENT_LIST_PLACEHOLDER and
+    FEATURES_PLACEHOLDER exactly once each, in that order, followed by
+    LOOKUP_PLACEHOLDER for the chapter data of the nearest-chapter lookup
+    when `nearest_lookup` is set. Its size does not depend on the data.
+    """
+    country_colors = country_colors or builder.COUNTRY_COLORS
+    labels = builder.LABELS[language]
+    m = builder.create_itsmf_apac_map(
+        [], country_colors=country_colors, language=language, render_mode='markers',
+        chapter_list_html=CHAPTER_LIST_PLACEHOLDER, event_list_html=EVENT_LIST_PLACEHOLDER,
+        **map_options
+    )
+    ChapterGeoJson(country_colors, labels, features_placeholder=FEATURES_PLACEHOLDER).add_to(m)
+    if nearest_lookup:
+        NearestChapterLookup(None, labels['nearest_chapter'], data_placeholder=LOOKUP_PLACEHOLDER).add_to(m)
+    return m.get_root().render()
+
+
+def _split_shell(shell, placeholders):
+    parts = []
+    for placeholder in placeholders:
+        head, sep, shell = shell.partition(placeholder)
+        if not sep:
+            raise ValueError(f"Page shell is missing {placeholder!r}")
+        parts.append(head)
+    parts.append(shell)
+    return parts
+
+
+def stream_map(out, chapters=None, events=None, country_colors=None, language='en',
+               event_list='cards', event_page_size=builder.EVENT_PAGE_SIZE, upcoming_days=None,
+               event_countries=None, today=None, nearest_lookup=False, **map_options):
+    """
+    Write the map page to the text stream `out` component by component.
+
+    Chapters are read once: each legend row is written straight to `out`
+    while its GeoJSON marker feature goes to a spool file (memory up to
+    SPOOL_MAX_SIZE, then disk), which is copied in after the event cards.
+    No rendered component is ever joined into one big string, so memory
+    beyond the event records themselves stays flat; `nearest_lookup`
+    also keeps each chapter's coordinates and name for the lookup data.
+    `events` may be an EventIndex, and `upcoming_days`, `event_countries`
+    and `today` select the events as in create_itsmf_apac_map. Returns
+    (chapter count, event count).
+    """
+    if chapters is None:
+        chapters = iter_chapters(CHAPTERS_FILE)
+    if events is None:
+        events = iter_events(EVENTS_FILE)
+    if not isinstance(events, (SortedEvents, EventIndex)):
+        events = sort_events(events)
+    events = builder.select_events(events, upcoming_days, event_countries, today)
+    country_colors = country_colors or builder.COUNTRY_COLORS
+    labels = builder.LABELS[language]
+
+    placeholders = [CHAPTER_LIST_PLACEHOLDER, EVENT_LIST_PLACEHOLDER, FEATURES_PLACEHOLDER]
+    if nearest_lookup:
+        placeholders.append(LOOKUP_PLACEHOLDER)
+    parts = _split_shell(render_shell(country_colors, language, nearest_lookup, **map_options), placeholders)
+
+    legend_row = fragment_template(LEGEND_ROW_TEMPLATE).render
+    chapter_count = 0
+    lookup_lat, lookup_lon, lookup_names = [], [], []
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode='w+', encoding='utf-8') as features:
+        out.write(parts[0])
+        for chapter in chapters:
+            out.write(legend_row(chapter, country_colors.get(chapter['country'], DEFAULT_COLOR)))
+            if chapter_count:
+                features.write(',')
+            features.write(chapter_feature_json(chapter))
+            if nearest_lookup:
+                lookup_lat.append(chapter['lat'])
+                lookup_lon.append(chapter['lon'])
+                lookup_names.append(f"{chapter['chapter']} ({chapter['city']})")
+            chapter_count += 1
+
+        out.write(parts[1])
+        for chunk in builder.iter_event_list(events, country_colors, labels,
+                                             event_list, event_page_size):
+            out.write(chunk)
+
+        out.write(parts[2])
+        features.seek(0)
+        shutil.copyfileobj(features, out)
+    if nearest_lookup:
+        out.write(parts[3])
+        out.write(nearest_lookup_json(lookup_lat, lookup_lon, lookup_names, labels['nearest_chapter']))
+    out.write(parts[-1])
+    return chapter_count, len(events)
+
+
+def write_map(output_file, chapters=None, events=None, **options):
+    """
+    Stream the map page to `output_file` atomically.
+
+    The page is written to a temporary file in the same directory and
+    moved into place only once complete, so readers never see a partial
+    page. Returns (chapter count, event count).
+    """
+    options.setdefault('out_dir', os.path.dirname(os.path.abspath(output_file)))
+    with AtomicFile(output_file) as f:
+        return stream_map(f, chapters, events, **options)
@@ -0,0 +1,358 @@
+import argparse
+import asyncio
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from itsmf_data import CHAPTERS_FILE, iter_chapters, write_atomic
+
+MBTILES_FILE = os.path.join('.itsmf_cache', 'tiles.mbtiles')
+# The OSM tile usage policy forbids bulk downloads, so prefetch refuses this host
+OSM_TILE_HOST = 'tile.openstreetmap.org'
+OSM_ATTRIBUTION = '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+# Directory (next to the page) and URL template of exported tiles
+TILE_DIR = 'tiles'
+LOCAL_TILE_URL = TILE_DIR + '/{z}/{x}/{y}.png'
+
+DEFAULT_ZOOMS = (2, 6)
+# Degrees added around the chapters' bounding box
+DEFAULT_MARGIN = 5.0
+# Web Mercator stops here; tiles beyond it do not exist
+MAX_LAT = 85.05112878
+# At most two connections per tile server, each request started at least
+# DEFAULT_HOST_INTERVAL seconds after the previous one
+DEFAULT_PER_HOST = 2
+DEFAULT_HOST_INTERVAL = 0.5
+# Tiles written to the store per transaction
+WRITE_BATCH = 256
+
+
+def chapters_bbox(chapters, margin=DEFAULT_MARGIN):
+    """Return (south, west, north, east) around all chapters, widened by `margin` degrees."""
+    south = west = math.inf
+    north = east = -math.inf
+    for chapter in chapters:
+        south, north = min(south, chapter['lat']), max(north, chapter['lat'])
+        west, east = min(west, chapter['lon']), max(east, chapter['lon'])
+    if south == math.inf:
+        raise ValueError("No chapters to take a bounding box of")
+    return (max(-MAX_LAT, south - margin), max(-180.0, west - margin),
+            min(MAX_LAT, north + margin), min(180.0, east + margin))
+
+
+def tile_xy(lat, lon, zoom):
+    """Return the (x, y) of the XYZ tile containing a point at `zoom`."""
+    n = 1 << zoom
+    lat = math.radians(max(-MAX_LAT, min(MAX_LAT, lat)))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def iter_tiles(bbox, zooms=DEFAULT_ZOOMS):
+    """Yield the (z, x, y) tiles covering `bbox` for every zoom in the inclusive range `zooms`."""
+    south, west, north, east = bbox
+    for z in range(zooms[0], zooms[1] + 1):
+        x0, y0 = tile_xy(north, west, z)
+        x1, y1 = tile_xy(south, east, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+class TileStore:
+    """
+    Tiles in an MBTiles (SQLite) file.
+
+    Coordinates are XYZ as in the tile URLs; rows are stored flipped (TMS)
+    as the MBTiles spec requires. One connection is shared by the
+    prefetcher and the tile server threads behind a lock.
+    """
+    __slots__ = ('path', 'db', 'lock')
+
+    def __init__(self, path=MBTILES_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, '
+                            'tile_row INTEGER, tile_data BLOB, PRIMARY KEY (zoom_level, tile_column, tile_row))')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def get(self, z, x, y):
+        """Return the tile bytes, or None if it is not stored."""
+        with self.lock:
+            row = self.db.execute('SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?',
+                                  (z, x, (1 << z) - 1 - y)).fetchone()
+        return None if row is None else row[0]
+
+    def missing(self, tiles):
+        """Return the (z, x, y) of `tiles` not in the store, in order."""
+        with self.lock:
+            stored = set(self.db.execute('SELECT zoom_level, tile_column, tile_row FROM tiles'))
+        return [(z, x, y) for z, x, y in tiles if (z, x, (1 << z) - 1 - y) not in stored]
+
+    def put_many(self, tiles):
+        """Store an iterable of (z, x, y, data) in one transaction."""
+        with self.lock, self.db:
+            self.db.executemany('INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)',
+                                ((z, x, (1 << z) - 1 - y, data) for z, x, y, data in tiles))
+
+    def set_metadata(self, **values):
+        with self.lock, self.db:
+            self.db.executemany('INSERT OR REPLACE INTO metadata VALUES (?, ?)',
+                                ((k, str(v)) for k, v in values.items()))
+
+    def metadata(self):
+        with self.lock:
+            return dict(self.db.execute('SELECT name, value FROM metadata'))
+
+    def zoom_range(self):
+        """Return (min_zoom, max_zoom) of the stored tiles, or None when empty."""
+        with self.lock:
+            low, high = self.db.execute('SELECT MIN(zoom_level), MAX(zoom_level) FROM tiles').fetchone()
+        return None if low is None else (low, high)
+
+    def iter_all(self):
+        """Yield (z, x, y, data) of every stored tile."""
+        with self.lock:
+            rows = self.db.execute('SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles').fetchall()
+        for z, x, row, data in rows:
+            yield z, x, (1 << z) - 1 - row, data
+
+
+class HttpTileFetcher:
+    """
+    Fetches XYZ tiles over an itsmf_http.HttpClient.
+
+    Any object with a coroutine `fetch(z, x, y)` returning the tile bytes
+    (or None) can stand in for it, e.g. one pointing `url` at a local
+    tile server.
+    """
+    __slots__ = ('url', 'client')
+
+    def __init__(self, client, url):
+        self.client = client
+        self.url = url
+
+    async def fetch(self, z, x, y):
+        response = await self.client.get(self.url.format(z=z, x=x, y=y))
+        if response.error is not None or response.status != 200:
+            return None
+        return response.body
+
+
+async def prefetch(store, tiles, fetcher, batch=WRITE_BATCH):
+    """
+    Download the `tiles` missing from `store`; return (fetched, failed) counts.
+
+    All requests are started at once and the fetcher's client limits how
+    many run in parallel; finished tiles are written in batches of `batch`.
+    """
+    pending = store.missing(tiles)
+    fetched = failed = 0
+    done = []
+
+    async def fetch(z, x, y):
+        return z, x, y, await fetcher.fetch(z, x, y)
+
+    for task in asyncio.as_completed([fetch(z, x, y) for z, x, y in pending]):
+        z, x, y, data = await task
+        if data is None:
+            failed += 1
+            continue
+        done.append((z, x, y, data))
+        fetched += 1
+        if len(done) >= batch:
+            store.put_many(done)
+            done = []
+    store.put_many(done)
+    return fetched, failed
+
+
+def check_tile_url(url):
+    """Raise ValueError unless `url` is a tile URL template that may be bulk-downloaded from."""
+    host = (urlsplit(url).hostname or '').lower()
+    if host == OSM_TILE_HOST or host.endswith('.' + OSM_TILE_HOST):
+        raise ValueError(f"{host} does not allow bulk downloads (see "
+                         "https://operations.osmfoundation.org/policies/tiles/); "
+                         "use a tile provider that does")
+    if not all(f'{{{key}}}' in url for key in 'zxy'):
+        raise ValueError(f"Tile URL template needs {{z}}, {{x}} and {{y}}: {url}")
+
+
+def run_prefetch(chapters=None, zooms=DEFAULT_ZOOMS, url=None, path=MBTILES_FILE,
+                 margin=DEFAULT_MARGIN, per_host=DEFAULT_PER_HOST, fetcher=None, contact=None,
+                 host_interval=DEFAULT_HOST_INTERVAL):
+    """
+    Prefetch the tiles around the chapters into the MBTiles store at `path`.
+
+    Without a `fetcher`, tiles are downloaded from the `url` template
+    (see check_tile_url) with `contact` (an email address or URL) in the
+    User-Agent, as tile providers ask. Returns (bbox, total, fetched,
+    failed). Tiles already stored are not downloaded again.
+    """
+    from itsmf_http import USER_AGENT, HttpClient
+
+    if fetcher is None:
+        if url is None or not contact:
+            raise ValueError("Downloading tiles needs a tile URL template and contact details")
+        check_tile_url(url)
+    if chapters is None:
+        chapters = iter_chapters(CHAPTERS_FILE)
+    bbox = chapters_bbox(chapters, margin)
+    tiles = list(iter_tiles(bbox, zooms))
+    with TileStore(path) as store:
+        if fetcher is not None:
+            fetched, failed = asyncio.run(prefetch(store, tiles, fetcher))
+        else:
+            with HttpClient(concurrency=per_host, per_host=per_host, host_interval=host_interval,
+                            user_agent=f"{USER_AGENT} ({contact})") as client:
+                fetched, failed = asyncio.run(prefetch(store, tiles, HttpTileFetcher(client, url)))
+        zoom_range = store.zoom_range() or zooms
+        store.set_metadata(name='itsmf', format='png', type='baselayer', attribution=OSM_ATTRIBUTION,
+                           bounds=','.join(str(round(v, 5)) for v in (bbox[1], bbox[0], bbox[3], bbox[2])),
+                           minzoom=zoom_range[0], maxzoom=zoom_range[1])
+    return bbox, len(tiles), fetched, failed
+
+
+def export_tiles(out_dir, path=MBTILES_FILE):
+    """
+    Write the stored tiles to `out_dir`/tiles/{z}/{x}/{y}.png for a file-based tile layer.
+
+    Tiles already exported with the same content are skipped. Returns
+    (written, max_zoom), max_zoom being None for an empty store.
+    """
+    written = 0
+    with TileStore(path) as store:
+        for z, x, y, data in store.iter_all():
+            tile_path = os.path.join(out_dir, TILE_DIR, str(z), str(x), f"{y}.png")
+            try:
+                with open(tile_path, 'rb') as f:
+                    if f.read() == data:
+                        continue
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+            write_atomic(tile_path, data)
+            written += 1
+        zoom_range = store.zoom_range()
+    return written, zoom_range and zoom_range[1]
+
+
+def max_zoom(path=MBTILES_FILE):
+    """Highest zoom level in the store, or None."""
+    with TileStore(path) as store:
+        zoom_range = store.zoom_range()
+    return zoom_range and zoom_range[1]
+
+
+class _TileHandler(BaseHTTPRequestHandler):
+    """Answers GET /{z}/{x}/{y}.png from the store."""
+    store = None
+
+    def do_GET(self):
+        try:
+            z, x, y = self.path.split('?')[0].strip('/').removesuffix('.png').split('/')
+            data = self.store.get(int(z), int(x), int(y))
+        except ValueError:
+            data = None
+        if data is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'public, max-age=86400')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(store, host='127.0.0.1', port=8090):
+    """Serve `store` over HTTP in a daemon thread; returns the server (URL template: see tile_url)."""
+    handler = type('TileHandler', (_TileHandler,), {'store': store})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def tile_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/{{z}}/{{x}}/{{y}}.png"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prefetch, export and serve map tiles around the chapters.')
+    parser.add_argument('--mbtiles', default=MBTILES_FILE)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fetch = commands.add_parser('prefetch', help='download the tiles around the chapters')
+    fetch.add_argument('--chapters', default=CHAPTERS_FILE)
+    fetch.add_argument('--zoom', type=int, nargs=2, default=DEFAULT_ZOOMS, metavar=('MIN', 'MAX'))
+    fetch.add_argument('--margin', type=float, default=DEFAULT_MARGIN, help='degrees around the chapters')
+    fetch.add_argument('--url', required=True,
+                       help='tile URL template with {z}, {x} and {y}, from a provider that allows bulk downloads')
+    fetch.add_argument('--contact', required=True,
+                       help='email address or URL sent in the User-Agent, so the provider can reach you')
+    fetch.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST)
+    fetch.add_argument('--host-interval', type=float, default=DEFAULT_HOST_INTERVAL,
+                       help='seconds between request starts (default %(default)s)')
+
+    export = commands.add_parser('export', help='write the tiles as files for a static page')
+    export.add_argument('out_dir')
+
+    server = commands.add_parser('serve', help='serve the tiles over HTTP')
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=8090)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == 'prefetch':
+        try:
+            check_tile_url(args.url)
+        except ValueError as exc:
+            parser.error(str(exc))
+        bbox, total, fetched, failed = run_prefetch(iter_chapters(args.chapters), tuple(args.zoom), args.url,
+                                                    args.mbtiles, args.margin, args.per_host,
+                                                    contact=args.contact, host_interval=args.host_interval)
+        print(f"bbox {', '.join(f'{v:.2f}' for v in bbox)}: {total} tiles, {fetched} fetched, "
+              f"{failed} failed, {total - fetched - failed} cached ({time.perf_counter() - start:.2f}s)")
+        return 1 if failed else 0
+    if args.command == 'export':
+        written, _ = export_tiles(args.out_dir, args.mbtiles)
+        print(f"{written} tiles written to '{os.path.join(args.out_dir, TILE_DIR)}'")
+        return 0
+
+    store = TileStore(args.mbtiles)
+    httpd = serve(store, args.host, args.port)
+    print(f"Serving tiles at {tile_url(httpd)} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        httpd.shutdown()
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
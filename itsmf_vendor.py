@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+import urllib.request
+from urllib.parse import urljoin, urlsplit
+
+import folium
+
+from itsmf_data import AtomicFile, write_atomic
+
+VENDOR_CACHE_DIR = os.path.join('.itsmf_cache', 'vendor')
+INDEX_FILE = 'index.json'
+
+# Never used by the generated page: folium popups need jQuery, but nothing
+# uses the Bootstrap JS plugins or the Bootstrap 3 glyphicons
+DEFAULT_DROP = ('bootstrap', 'glyphicons_css')
+
+# Only needed when the page has AwesomeMarkers icons
+AWESOME_MARKER_ASSETS = ('awesome_markers', 'awesome_markers_css', 'awesome_markers_font_css',
+                         'awesome_rotate_css')
+
+# Stylesheets needed for the first paint of the map
+CRITICAL_CSS = ('leaflet_css',)
+
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def _urlopen(url):
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return response.read()
+
+
+class VendorCache:
+    """
+    Downloads each CDN asset once into a local cache directory.
+
+    `fetch(url) -> bytes` does the actual download (urllib by default),
+    so tests and air-gapped builds can plug in their own. A cached URL is
+    never fetched again.
+    """
+
+    def __init__(self, cache_dir=VENDOR_CACHE_DIR, fetch=None):
+        self.cache_dir = cache_dir
+        self.fetch = fetch or _urlopen
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(os.path.join(cache_dir, INDEX_FILE), encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.index = {}
+
+    def get(self, url):
+        """Return the bytes for `url`, from the cache when possible."""
+        entry = self.index.get(url)
+        if entry is not None:
+            path = os.path.join(self.cache_dir, entry)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    return f.read()
+
+        data = self.fetch(url)
+        entry = hashlib.sha256(data).hexdigest()
+        write_atomic(os.path.join(self.cache_dir, entry), data)
+        self.index[url] = entry
+        self._save_index()
+        return data
+
+    def _save_index(self):
+        path = os.path.join(self.cache_dir, INDEX_FILE)
+        with AtomicFile(path) as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+
+
+def _hashed_name(url, data):
+    """'leaflet.css' + content -> 'leaflet.<sha12>.css'."""
+    base = posixpath.basename(urlsplit(url).path) or 'asset'
+    stem, ext = posixpath.splitext(base)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _write_once(directory, name, data):
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+def _walk(element):
+    yield element
+    for child in element._children.values():
+        yield from _walk(child)
+
+
+def _uses_awesome_markers(root):
+    from folium import plugins
+
+    return any(isinstance(el, (folium.Icon, plugins.FastMarkerCluster)) for el in _walk(root))
+
+
+def vendor_assets(m, out_dir='.', vendor_dir='vendor', cache=None, drop=DEFAULT_DROP,
+                  inline_critical=False):
+    """
+    Point every CDN script and stylesheet of map `m` at local copies.
+
+    Each asset is taken from the VendorCache (downloaded once), written
+    to `out_dir`/`vendor_dir` under a content-hashed name and linked
+    relatively, so the saved page loads with no CDN connections. Fonts and
+    images referenced from stylesheets are vendored too. Assets named in
+    `drop` are removed, as are the AwesomeMarkers assets when the map has
+    no such icons. With `inline_critical`, CRITICAL_CSS is inlined into
+    the page head instead of linked.
+
+    Call this after building the map and before saving it to `out_dir`.
+    Returns {asset name: local URL or 'inline'}.
+    """
+    cache = cache or VendorCache()
+    root = m.get_root()
+    drop = set(drop)
+    if not _uses_awesome_markers(root):
+        drop.update(AWESOME_MARKER_ASSETS)
+    target_dir = os.path.join(out_dir, vendor_dir)
+    os.makedirs(target_dir, exist_ok=True)
+
+    local = {}
+
+    def vendor_file(url, data):
+        name = _hashed_name(url, data)
+        _write_once(target_dir, name, data)
+        return name
+
+    def vendor_css(url):
+        css = cache.get(url).decode('utf-8')
+
+        def rewrite(match):
+            ref = match.group(2).strip()
+            if ref.startswith(('data:', '#')):
+                return match.group(0)
+            ref_url = urljoin(url, ref)
+            fetch_url = ref_url.split('#')[0]
+            try:
+                name = vendor_file(fetch_url.split('?')[0], cache.get(fetch_url))
+            except OSError as e:
+                print(f"Could not vendor '{ref_url}': {e}")
+                return f"url('{ref_url}')"
+            return f"url('{name}')"
+
+        return _CSS_URL.sub(rewrite, css)
+
+    inline_css = []
+    for element in _walk(root):
+        js = getattr(element, 'default_js', None)
+        css = getattr(element, 'default_css', None)
+        if js is None and css is None:
+            continue
+
+        new_js = []
+        for name, url in js or []:
+            if name in drop:
+                continue
+            if url not in local:
+                local[url] = f"{vendor_dir}/{vendor_file(url, cache.get(url))}"
+            new_js.append((name, local[url]))
+
+        new_css = []
+        for name, url in css or []:
+            if name in drop:
+                continue
+            if inline_critical and name in CRITICAL_CSS:
+                inline_css.append((name, vendor_css(url)))
+                continue
+            if url not in local:
+                data = vendor_css(url).encode('utf-8')
+                local[url] = f"{vendor_dir}/{vendor_file(url, data)}"
+            new_css.append((name, local[url]))
+
+        # Instance attributes, so the class-level CDN lists stay untouched
+        element.default_js = new_js
+        element.default_css = new_css
+
+    manifest = {}
+    for element in _walk(root):
+        for name, url in getattr(element, 'default_js', []) + getattr(element, 'default_css', []):
+            manifest[name] = url
+    for name, css in inline_css:
+        # Inlined CSS lives in the page, so its url()s need the vendor prefix
+        css = _CSS_URL.sub(lambda match: match.group(0) if match.group(2).startswith(('data:', '#', 'http'))
+                           else f"url('{vendor_dir}/{match.group(2)}')", css)
+        root.header.add_child(folium.Element(f"<style>{css}</style>"), name=f"inline_{name}")
+        manifest[name] = 'inline'
+    return manifest
@@ -0,0 +1,196 @@
+import argparse
+import functools
+import os
+import threading
+import time
+import webbrowser
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from itsmf_build_cache import build_map_html
+from itsmf_chapter_apac_v3 import LOGO_FILE
+from itsmf_data import CHAPTERS_FILE, EVENTS_FILE
+from itsmf_geocode import GAZETTEER_FILE
+
+WATCH_FILES = (CHAPTERS_FILE, EVENTS_FILE, LOGO_FILE, GAZETTEER_FILE)
+RELOAD_PATH = '/__itsmf_reload'
+
+# Reloads the page whenever the server announces a new build; EventSource
+# reconnects by itself if the server restarts
+RELOAD_SNIPPET = """
+<script>
+(function () {
+    var seen = null;
+    new EventSource('%s').onmessage = function (e) {
+        if (seen !== null && e.data !== seen) { window.location.reload(); }
+        seen = e.data;
+    };
+})();
+</script>
+""" % RELOAD_PATH
+
+
+def snapshot(paths):
+    """Map each path to (mtime_ns, size), or None if it does not exist."""
+    state = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+            state[path] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            state[path] = None
+    return state
+
+
+def watch(paths, on_change, interval=0.1, debounce=0.25, stop=None):
+    """
+    Poll `paths` and call on_change(changed_paths) once per burst of changes.
+
+    A change is only reported after the files have been quiet for
+    `debounce` seconds, so an editor's save-rename-touch sequence or a
+    copy of several files triggers a single rebuild. Runs until `stop`
+    (a threading.Event) is set.
+    """
+    stop = stop or threading.Event()
+    state = snapshot(paths)
+    changed = set()
+    last_change = 0.0
+    while not stop.wait(interval):
+        current = snapshot(paths)
+        for path in paths:
+            if current[path] != state[path]:
+                changed.add(path)
+                last_change = time.monotonic()
+        state = current
+        if changed and time.monotonic() - last_change >= debounce:
+            on_change(sorted(changed))
+            changed = set()
+
+
+class LiveReload:
+    """Build counter that server-sent-event clients wait on."""
+    __slots__ = ('version', '_condition')
+
+    def __init__(self):
+        self.version = 0
+        self._condition = threading.Condition()
+
+    def notify(self):
+        with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+
+    def wait(self, seen, timeout):
+        """Block until the version differs from `seen` (or timeout); return it."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != seen, timeout)
+            return self.version
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    """Serves the output directory, the page with RELOAD_SNIPPET, and the event stream."""
+    page = None
+    reload = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == RELOAD_PATH:
+            return self._event_stream()
+        if path in ('/', '/' + self.page):
+            return self._page()
+        return super().do_GET()
+
+    def _page(self):
+        try:
+            with open(os.path.join(self.directory, self.page), encoding='utf-8') as f:
+                html = f.read()
+        except FileNotFoundError:
+            self.send_error(404, 'Map not built yet')
+            return
+        # Injected when served, so the file on disk stays publishable as-is
+        head, sep, tail = html.rpartition('</body>')
+        html = head + RELOAD_SNIPPET + sep + tail if sep else html + RELOAD_SNIPPET
+        body = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _event_stream(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        seen = None
+        try:
+            while True:
+                version = self.reload.wait(seen, timeout=15)
+                # Unchanged after the timeout: a comment line keeps proxies from closing the stream
+                self.wfile.write(b': ping\n\n' if version == seen else f'data: {version}\n\n'.encode())
+                self.wfile.flush()
+                seen = version
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def serve(output_file, reload, host='127.0.0.1', port=8000):
+    """Start the preview server for `output_file` in a daemon thread and return it."""
+    directory = os.path.dirname(os.path.abspath(output_file))
+    handler = type('Handler', (_Handler,), {'page': os.path.basename(output_file), 'reload': reload})
+    server = ThreadingHTTPServer((host, port), functools.partial(handler, directory=directory))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def rebuild(output_file, reload, **build_options):
+    """Run build_map_html and notify the open pages unless nothing changed."""
+    start = time.perf_counter()
+    try:
+        status = build_map_html(output_file, **build_options)
+    except Exception as exc:
+        # Keep watching; the next save will usually fix a half-edited file
+        print(f"Rebuild failed: {exc}")
+        return None
+    if status != 'unchanged':
+        reload.notify()
+    print(f"Rebuild: {status} in {(time.perf_counter() - start) * 1000:.0f} ms", flush=True)
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild the ITSMF APAC map on change and live-reload it.')
+    parser.add_argument('--output', default='itsmf_apac_chapters.html', help='map HTML file')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--language', default='en')
+    parser.add_argument('--logo-mode', choices=('inline', 'file'), default=None)
+    parser.add_argument('--interval', type=float, default=0.1, help='poll interval in seconds')
+    parser.add_argument('--debounce', type=float, default=0.25, help='quiet time before rebuilding')
+    parser.add_argument('--open', action='store_true', help='open the page in a browser once')
+    args = parser.parse_args(argv)
+
+    build_options = {'language': args.language, 'logo_mode': args.logo_mode}
+    reload = LiveReload()
+    rebuild(args.output, reload, **build_options)
+    server = serve(args.output, reload, args.host, args.port)
+    url = f"http://{args.host}:{server.server_address[1]}/"
+    print(f"Serving {url} - watching {', '.join(WATCH_FILES)} (Ctrl+C to stop)")
+    if args.open:
+        webbrowser.open(url)
+
+    try:
+        watch(WATCH_FILES, lambda changed: rebuild(args.output, reload, **build_options),
+              args.interval, args.debounce)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import itsmf_build_cache
+import itsmf_data
+from itsmf_build_cache import build_map_html
+from itsmf_data import CHAPTER_FIELDS, EVENT_FIELDS, write_records
+from itsmf_event_index import load_event_index
+
+CHAPTERS = [{'country': 'Thailand', 'city': 'Bangkok', 'lat': 13.7563, 'lon': 100.5018,
+             'chapter': 'ITSMF Thailand', 'details': 'Bangkok chapter', 'website': 'https://itsmf.or.th'}]
+EVENTS = [{'country': 'Thailand', 'date': '09 October 2025', 'title': 'Webinar', 'link': 'https://a/1'}]
+
+
+def test_unchanged_files_are_not_read_again(tmp_path, monkeypatch):
+    chapters_file = str(tmp_path / 'chapters.csv')
+    events_file = str(tmp_path / 'events.csv')
+    write_records(chapters_file, CHAPTERS, CHAPTER_FIELDS)
+    write_records(events_file, EVENTS, EVENT_FIELDS)
+    index_file = str(tmp_path / 'events.pickle')
+    output = str(tmp_path / 'map.html')
+    cache_dir = str(tmp_path / 'cache')
+
+    events = load_event_index(events_file, index_file)
+    assert build_map_html(output, chapters_file, events, cache_dir=cache_dir) == 'full'
+
+    def fail(*args, **kwargs):
+        raise AssertionError('records were read')
+
+    monkeypatch.setattr(itsmf_data, 'iter_records', fail)
+    monkeypatch.setattr(itsmf_build_cache, '_hash_records', fail)
+    events = load_event_index(events_file, index_file)
+    assert build_map_html(output, chapters_file, events, cache_dir=cache_dir) == 'unchanged'
+
+
+def test_in_memory_records_are_hashed(tmp_path):
+    output = str(tmp_path / 'map.html')
+    cache_dir = str(tmp_path / 'cache')
+    assert build_map_html(output, CHAPTERS, EVENTS, cache_dir=cache_dir) == 'full'
+    assert build_map_html(output, CHAPTERS, EVENTS, cache_dir=cache_dir) == 'unchanged'
+    changed = [dict(EVENTS[0], title='Meetup')]
+    assert build_map_html(output, CHAPTERS, changed, cache_dir=cache_dir) == 'events'
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from itsmf_cli import main, validate_chapters
+from itsmf_data import CHAPTER_FIELDS, write_records
+
+
+def test_half_blank_coordinates_are_geocoded(tmp_path):
+    path = str(tmp_path / 'chapters.csv')
+    write_records(path, [
+        {'country': 'Thailand', 'city': 'Bangkok', 'lat': '13.75', 'lon': '', 'chapter': 'ITSMF Thailand',
+         'website': 'https://itsmf.or.th'},
+        {'country': 'Thailand', 'city': 'Nowhere', 'lat': '', 'lon': '100.5', 'chapter': 'ITSMF Nowhere',
+         'website': 'https://example.org'},
+    ], CHAPTER_FIELDS)
+    assert list(validate_chapters(path)) == [(3, "no coordinates and no gazetteer entry for 'Nowhere'")]
+
+
+def test_sharded_render_rejects_chapter_layer_options(capsys):
+    with pytest.raises(SystemExit):
+        main(['render', '--sharded', '--nearest-lookup'])
+    assert '--sharded' in capsys.readouterr().err
+
+
+def test_sharded_render_publishes_shell_and_shards(tmp_path):
+    output = str(tmp_path / 'map.html')
+    assert main(['render', '--sharded', '--publish', '--output', output]) == 0
+    assert os.path.exists(output + '.gz')
+    assert os.path.exists(tmp_path / 'shards' / 'apac.js.gz')
+    assert main(['render', '--sharded', '--output', output]) == 0
+    assert not os.path.exists(output + '.gz')
+    assert not os.path.exists(tmp_path / 'shards' / 'apac.js.gz')
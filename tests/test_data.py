@@ -0,0 +1,49 @@
+import os
+import stat
+
+import pytest
+
+from itsmf_data import EVENT_FIELDS, AtomicFile, iter_records, write_atomic, write_records
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_file_gets_the_umask_mode(tmp_path):
+    path = tmp_path / 'page.html'
+    write_atomic(str(path), '<html></html>')
+    umask = os.umask(0)
+    os.umask(umask)
+    assert path.read_text() == '<html></html>'
+    assert _mode(path) == 0o666 & ~umask
+
+
+def test_replaced_file_keeps_its_mode(tmp_path):
+    path = tmp_path / 'page.html'
+    path.write_bytes(b'old')
+    os.chmod(path, 0o640)
+    write_atomic(str(path), b'new')
+    assert path.read_bytes() == b'new'
+    assert _mode(path) == 0o640
+
+
+def test_failed_write_leaves_the_file_alone(tmp_path):
+    path = tmp_path / 'page.html'
+    path.write_text('old')
+    with pytest.raises(RuntimeError):
+        with AtomicFile(str(path)) as f:
+            f.write('partial')
+            raise RuntimeError
+    assert path.read_text() == 'old'
+    assert os.listdir(tmp_path) == ['page.html']
+
+
+def test_records_can_be_rewritten_in_place(tmp_path):
+    path = str(tmp_path / 'events.jsonl')
+    events = [{'country': 'Thailand', 'date': f'0{day} October 2025', 'title': 'Webinar', 'link': ''}
+              for day in range(1, 10)]
+    write_records(path, events, EVENT_FIELDS)
+    assert write_records(path, iter_records(path), EVENT_FIELDS) == 9
+    assert list(iter_records(path)) == events
+    assert os.listdir(tmp_path) == ['events.jsonl']
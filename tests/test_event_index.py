@@ -0,0 +1,22 @@
+import pytest
+
+from itsmf_data import EVENT_FIELDS, write_records
+from itsmf_event_index import index_file_for, load_event_index
+
+EVENTS = [{'country': 'Thailand', 'date': '09 October 2025', 'title': 'Webinar', 'link': 'https://a/1'}]
+
+
+# Pickles of a class from a module that is gone, of a name that is gone, and a truncated one
+@pytest.mark.parametrize('saved', [b'citsmf_gone\nEventIndex\n.', b'cbuiltins\nMissing\n.', b'\x80\x04'])
+def test_damaged_event_index_is_rebuilt(saved, tmp_path):
+    events_file = str(tmp_path / 'events.csv')
+    write_records(events_file, EVENTS, EVENT_FIELDS)
+    index_file = tmp_path / 'events.pickle'
+    index_file.write_bytes(saved)
+    index = load_event_index(events_file, str(index_file))
+    assert [e['title'] for e in index.events] == ['Webinar']
+    assert load_event_index(events_file, str(index_file)).source_key == index.source_key
+
+
+def test_each_events_file_has_its_own_index(tmp_path):
+    assert index_file_for(str(tmp_path / 'a.csv')) != index_file_for(str(tmp_path / 'b.csv'))
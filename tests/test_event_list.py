@@ -0,0 +1,14 @@
+from itsmf_event_list import virtual_event_list_html
+
+EVENTS = [{'country': 'Thailand', 'date': 'Thursday, 09 October 2025', 'title': 'Webinar', 'link': 'https://a/1'}]
+LABELS = {'more_info': 'More info'}
+
+
+def test_same_list_renders_the_same_bytes():
+    first = virtual_event_list_html(EVENTS, {'Thailand': '#ff0000'}, LABELS)
+    assert virtual_event_list_html(EVENTS, {'Thailand': '#ff0000'}, LABELS) == first
+
+
+def test_page_size_covers_the_visible_rows():
+    html = virtual_event_list_html(EVENTS, {}, LABELS, page_size=1, row_height=50, height=300)
+    assert 'pageSize = 7;' in html
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+import itsmf_build_cache
+import itsmf_export
+from itsmf_export import export_all, output_paths
+
+CHAPTERS = [{'country': 'Thailand', 'city': 'Bangkok', 'lat': 13.7563, 'lon': 100.5018,
+             'chapter': 'ITSMF Thailand', 'details': 'Bangkok chapter', 'website': 'https://itsmf.or.th'}]
+EVENTS = [{'country': 'Thailand', 'date': '09 October 2025', 'title': 'Webinar', 'link': 'https://a/1'}]
+
+
+def test_text_formats(tmp_path):
+    paths = output_paths(str(tmp_path), ('markdown', 'json', 'ics'))
+    assert export_all(paths, CHAPTERS, EVENTS) == (1, 1)
+    with open(paths['markdown'], encoding='utf-8') as f:
+        assert '- Thailand: [ITSMF Thailand](https://itsmf.or.th), Bangkok' in f.read()
+    with open(paths['ics'], encoding='utf-8', newline='') as f:
+        assert 'DTSTART;VALUE=DATE:20251009\r\n' in f.read()
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in paths.values())
+
+
+def test_failed_map_replaces_no_file(tmp_path, monkeypatch):
+    paths = output_paths(str(tmp_path), ('map', 'markdown', 'json'))
+    with open(paths['markdown'], 'w', encoding='utf-8') as f:
+        f.write('previous list\n')
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('render failed')
+
+    monkeypatch.setattr(itsmf_build_cache, 'build_map_html', fail)
+    with pytest.raises(RuntimeError):
+        export_all(paths, CHAPTERS, EVENTS)
+    with open(paths['markdown'], encoding='utf-8') as f:
+        assert f.read() == 'previous list\n'
+    assert sorted(os.listdir(tmp_path)) == ['itsmf_apac_chapter_list.md']
+
+
+def test_failure_while_finishing_replaces_no_file(tmp_path, monkeypatch):
+    paths = output_paths(str(tmp_path), ('map', 'markdown', 'ics'))
+    with open(paths['markdown'], 'w', encoding='utf-8') as f:
+        f.write('previous list\n')
+    fold = itsmf_export.ics_fold
+
+    def fail_at_end(line):
+        if line == 'END:VCALENDAR':
+            raise OSError('disk full')
+        return fold(line)
+
+    monkeypatch.setattr(itsmf_export, 'ics_fold', fail_at_end)
+    with pytest.raises(OSError):
+        export_all(paths, CHAPTERS, EVENTS, cache_dir=str(tmp_path / 'cache'))
+    with open(paths['markdown'], encoding='utf-8') as f:
+        assert f.read() == 'previous list\n'
+    assert not os.path.exists(paths['map'])
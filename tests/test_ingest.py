@@ -0,0 +1,137 @@
+import itsmf_ingest
+from itsmf_ingest import merge_events, parse_event_page, run_ingest
+
+# Two events in a site-ym style listing: each title link is followed by its date
+LISTING = """
+<html><body>
+<h2>Upcoming Events</h2>
+<div class="event">
+  <a href="/events/EventDetails.aspx?id=1982781">National Monthly Event - SIAM Bodies of Knowledge</a>
+  <div class="date">Thursday, 11 September 2025</div>
+</div>
+<div class="event">
+  <a href="/events/EventDetails.aspx?id=1983729">ACT F2F Event - AI-Driven ITSM</a>
+  <div class="date">Thursday, 25 September 2025</div>
+</div>
+</body></html>
+"""
+
+
+def test_listing_dates_come_from_below_each_link():
+    events = parse_event_page(LISTING, 'https://itsmfaus.site-ym.com/events/', 'Australia')
+    assert [(e['title'], e['date']) for e in events] == [
+        ('National Monthly Event - SIAM Bodies of Knowledge', 'Thursday, 11 September 2025'),
+        ('ACT F2F Event - AI-Driven ITSM', 'Thursday, 25 September 2025'),
+    ]
+    assert events[1]['link'] == 'https://itsmfaus.site-ym.com/events/EventDetails.aspx?id=1983729'
+    assert {e['country'] for e in events} == {'Australia'}
+
+
+def test_date_before_link_is_used_when_nothing_follows():
+    page = ('<p>Saturday, 04 October 2025</p>'
+            '<a href="/events/EventDetails.aspx?id=1">Last event</a>')
+    [event] = parse_event_page(page, 'https://example.org/', 'Australia')
+    assert event['date'] == 'Saturday, 04 October 2025'
+
+
+def test_json_ld_events_take_precedence():
+    page = """
+    <script type="application/ld+json">
+    {"@context": "https://schema.org", "@type": "Event", "name": "ITSM &amp; Business Continuity",
+     "startDate": "2025-10-09T10:00:00+07:00", "url": "/events/7368878092259426305"}
+    </script>
+    <a href="/events/EventDetails.aspx?id=2">Not this one</a> 01 January 2026
+    """
+    [event] = parse_event_page(page, 'https://www.linkedin.com/', 'Thailand')
+    assert event == {'country': 'Thailand', 'date': 'Thursday, 09 October 2025',
+                     'title': 'ITSM & Business Continuity',
+                     'link': 'https://www.linkedin.com/events/7368878092259426305'}
+
+
+def test_non_http_links_are_dropped():
+    page = ('<a href="javascript:alert(1)//EventDetails.aspx?id=1">Bad link</a> 01 January 2026'
+            '<a href="/events/EventDetails.aspx?id=2">Good &lt;b&gt;link</a> 02 January 2026')
+    [event] = parse_event_page(page, 'https://example.org/', 'Australia')
+    assert event['link'] == 'https://example.org/events/EventDetails.aspx?id=2'
+    assert event['title'] == 'Good <b>link'
+
+
+def _listing_route(etag='"v1"', body=LISTING.encode('utf-8')):
+    def route(method, headers):
+        if etag and headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        response_headers = {'Content-Type': 'text/html; charset=utf-8'}
+        if etag:
+            response_headers['ETag'] = etag
+        return 200, response_headers, body
+    return route
+
+
+def test_unchanged_page_is_answered_by_304(stub_server, tmp_path):
+    stub_server.routes['/events/'] = _listing_route()
+    sources = [('Australia', stub_server.url('/events/'))]
+    cache_dir = str(tmp_path / 'ingest')
+
+    [(_, _, status, events)] = run_ingest(sources, cache_dir, timeout=2)
+    assert status == 'fresh'
+    assert [e['date'] for e in events] == ['Thursday, 11 September 2025', 'Thursday, 25 September 2025']
+    assert 'If-None-Match' not in stub_server.requests[0][2]
+
+    [(_, _, status, cached)] = run_ingest(sources, cache_dir, timeout=2)
+    assert status == 'unchanged'
+    assert cached == events
+    assert stub_server.requests[1][2]['If-None-Match'] == '"v1"'
+
+
+def test_changed_page_is_parsed_again(stub_server, tmp_path):
+    stub_server.routes['/events/'] = _listing_route()
+    sources = [('Australia', stub_server.url('/events/'))]
+    cache_dir = str(tmp_path / 'ingest')
+    run_ingest(sources, cache_dir, timeout=2)
+
+    page = LISTING.replace('25 September', '02 October')
+    stub_server.routes['/events/'] = _listing_route('"v2"', page.encode('utf-8'))
+    [(_, _, status, events)] = run_ingest(sources, cache_dir, timeout=2)
+    assert status == 'fresh'
+    assert events[1]['date'] == 'Thursday, 02 October 2025'
+
+
+def test_same_body_without_validators_is_not_parsed_again(stub_server, tmp_path, monkeypatch):
+    stub_server.routes['/events/'] = _listing_route(etag=None)
+    sources = [('Australia', stub_server.url('/events/'))]
+    cache_dir = str(tmp_path / 'ingest')
+    [(_, _, _, events)] = run_ingest(sources, cache_dir, timeout=2)
+
+    def fail(*args):
+        raise AssertionError('page parsed again')
+
+    monkeypatch.setattr(itsmf_ingest, 'parse_event_page', fail)
+    [(_, _, status, cached)] = run_ingest(sources, cache_dir, timeout=2)
+    assert status == 'fresh'
+    assert cached == events
+
+
+def test_failed_fetch_is_reported(stub_server, tmp_path):
+    [(_, _, status, events)] = run_ingest([('Australia', stub_server.url('/missing'))],
+                                          str(tmp_path / 'ingest'), timeout=2)
+    assert status == 'HTTP 404'
+    assert events == []
+
+
+def test_unknown_charset_falls_back_to_utf8(stub_server, tmp_path):
+    stub_server.routes['/events/'] = lambda method, headers: (
+        200, {'Content-Type': 'text/html; charset=x-unknown'}, LISTING.encode('utf-8'))
+    [(_, _, status, events)] = run_ingest([('Australia', stub_server.url('/events/'))],
+                                          str(tmp_path / 'ingest'), timeout=2)
+    assert status == 'fresh'
+    assert len(events) == 2
+
+
+def test_merge_keeps_existing_events_and_sorts_by_date():
+    existing = [{'country': 'Thailand', 'date': '09 October 2025', 'title': 'Webinar', 'link': 'https://a/1'}]
+    ingested = [
+        {'country': 'Thailand', 'date': 'Thursday, 09 October 2025', 'title': 'Renamed', 'link': 'https://a/1'},
+        {'country': 'Australia', 'date': 'Thursday, 25 September 2025', 'title': 'ACT', 'link': 'https://a/2'},
+    ]
+    merged = merge_events(existing, ingested)
+    assert [e['title'] for e in merged] == ['ACT', 'Webinar']
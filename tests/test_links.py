@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from itsmf_http import HttpClient
+from itsmf_links import check_links, classify, collect_links, run_check
+
+
+def _status(status, allow_head=True):
+    def route(method, headers):
+        if method == 'HEAD' and not allow_head:
+            return 405, {}, b''
+        return status, {}, b'<html></html>'
+    return route
+
+
+def _check(urls, cache=None, ttl=3600, now=None):
+    with HttpClient(concurrency=8, per_host=4, timeout=2) as client:
+        return asyncio.run(check_links(urls, client, cache, ttl, now))
+
+
+def test_classify():
+    assert classify(200, None) == 'ok'
+    assert classify(301, None) == 'ok'
+    assert classify(999, None) == 'blocked'
+    assert classify(403, None) == 'blocked'
+    assert classify(404, None) == 'broken'
+    assert classify(None, 'ConnectionError') == 'broken'
+
+
+def test_links_are_classified(stub_server):
+    stub_server.routes.update({
+        '/ok': _status(200),
+        '/gone': _status(404),
+        '/linkedin': _status(999),
+        '/no-head': _status(200, allow_head=False),
+    })
+    urls = [stub_server.url(path) for path in ('/ok', '/gone', '/linkedin', '/no-head')]
+    results = _check(urls)
+    assert [results[url]['state'] for url in urls] == ['ok', 'broken', 'blocked', 'ok']
+    # HEAD first, and GET only where HEAD was rejected
+    assert sorted(stub_server.paths('GET')) == ['/no-head']
+    assert sorted(stub_server.paths('HEAD')) == ['/gone', '/linkedin', '/no-head', '/ok']
+
+
+def test_unreachable_host_is_broken():
+    results = _check(['http://127.0.0.1:9/'])
+    assert results['http://127.0.0.1:9/']['state'] == 'broken'
+    assert results['http://127.0.0.1:9/']['error'].startswith('ConnectionError')
+
+
+def test_cached_results_are_reused_within_ttl(stub_server):
+    stub_server.routes.update({'/ok': _status(200), '/gone': _status(404)})
+    ok, gone = stub_server.url('/ok'), stub_server.url('/gone')
+    cache = _check([ok, gone], now=1000.0)
+    for result in cache.values():
+        result['checked'] = 1000.0
+    stub_server.requests.clear()
+
+    results = _check([ok, gone], cache, ttl=60, now=1030.0)
+    assert results[ok] is cache[ok]
+    # Broken links are always checked again
+    assert stub_server.paths() == ['/gone']
+
+    stub_server.requests.clear()
+    _check([ok, gone], cache, ttl=60, now=1100.0)
+    assert sorted(stub_server.paths()) == ['/gone', '/ok']
+
+
+def test_run_check_persists_the_cache(stub_server, tmp_path):
+    stub_server.routes['/site'] = _status(200)
+    stub_server.routes['/event'] = _status(200)
+    chapters = [{'chapter': 'ITSMF Test', 'website': stub_server.url('/site')}]
+    events = [{'title': 'Meetup', 'link': stub_server.url('/event')}]
+    cache_file = str(tmp_path / 'links.json')
+
+    links, results = run_check(chapters, events, cache_file=cache_file, timeout=2)
+    assert links == collect_links(chapters, events)
+    assert {result['state'] for result in results.values()} == {'ok'}
+
+    stub_server.requests.clear()
+    run_check(chapters, events, cache_file=cache_file, timeout=2)
+    assert stub_server.requests == []
+
+
+def test_slow_link_times_out(stub_server):
+    def slow(method, headers):
+        time.sleep(0.5)
+        return 200, {}, b''
+
+    stub_server.routes['/slow'] = slow
+    with HttpClient(timeout=0.1) as client:
+        results = asyncio.run(check_links([stub_server.url('/slow')], client))
+    assert results[stub_server.url('/slow')]['state'] == 'broken'
+    assert 'Timeout' in results[stub_server.url('/slow')]['error']
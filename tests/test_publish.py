@@ -0,0 +1,52 @@
+import gzip
+import os
+
+from itsmf_build_cache import build_map_html
+from itsmf_publish import minify_css, minify_html, precompress
+
+
+def test_minify_css_keeps_descendant_pseudo_selectors():
+    css = 'a :hover { color : red ; }\n.x > .y , .z::before { margin : 0 }'
+    assert minify_css(css) == 'a :hover{color:red}.x>.y,.z::before{margin:0}'
+
+
+def test_minify_css_inside_media_queries():
+    css = '/* focus */ @media (max-width: 600px) { .leaflet-container :focus { outline : none; } }'
+    assert minify_css(css) == '@media (max-width: 600px){.leaflet-container :focus{outline:none}}'
+
+
+def test_minify_css_declaration_list():
+    assert minify_css(' color : red ; width : 10px; ') == 'color:red;width:10px'
+
+
+def test_minify_html():
+    page = ('<html>\n  <head>\n    <style>\n      a :hover { color : red; }\n    </style>\n  </head>\n'
+            '  <body>\n    <!-- note -->\n    <div style="color : red ; ">Hello   world</div>\n  </body>\n</html>')
+    assert minify_html(page) == ('<html><head><style>a :hover{color:red}</style></head>'
+                                 '<body><div style="color:red">Hello world</div></body></html>')
+
+
+def test_precompress_writes_gzip(tmp_path):
+    path = tmp_path / 'page.html'
+    path.write_text('<p>itsmf</p>' * 100)
+    outputs = precompress(str(path))
+    with open(outputs['gz'], 'rb') as f:
+        assert gzip.decompress(f.read()) == path.read_bytes()
+
+
+def test_unpublished_build_removes_precompressed_siblings(tmp_path):
+    chapters = [{'country': 'Thailand', 'city': 'Bangkok', 'lat': 13.7563, 'lon': 100.5018,
+                 'chapter': 'ITSMF Thailand', 'details': 'Bangkok chapter', 'website': 'https://itsmf.or.th'}]
+    events = [{'country': 'Thailand', 'date': '09 October 2025', 'title': 'Webinar', 'link': 'https://a/1'}]
+    output = str(tmp_path / 'map.html')
+    cache_dir = str(tmp_path / 'cache')
+
+    assert build_map_html(output, chapters, events, cache_dir=cache_dir, publish=True) == 'full'
+    assert os.path.exists(output + '.gz')
+    assert build_map_html(output, chapters, events, cache_dir=cache_dir) == 'full'
+    assert not os.path.exists(output + '.gz')
+
+    # A sibling that reappears is not hidden behind the 'unchanged' shortcut
+    precompress(output)
+    assert build_map_html(output, chapters, events, cache_dir=cache_dir) == 'events'
+    assert not os.path.exists(output + '.gz')
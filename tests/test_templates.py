@@ -0,0 +1,26 @@
+from itsmf_columns import EventColumns
+from itsmf_templates import EVENT_CARD_TEMPLATE, fragment_template
+
+EVENT = {'country': 'Thailand', 'date': 'Thursday, 09 October 2025',
+         'title': 'Meetup <img src=x onerror=alert(1)>',
+         'link': 'https://example.org/?a=1&b="2"'}
+
+
+def test_fields_are_escaped():
+    html = fragment_template(EVENT_CARD_TEMPLATE, {'more_info': 'More'}).render(EVENT, '#ff0000')
+    assert '<img' not in html
+    assert 'Meetup &lt;img src=x onerror=alert(1)&gt;' in html
+    assert 'href="https://example.org/?a=1&amp;b=&quot;2&quot;"' in html
+
+
+def test_render_fields_matches_render():
+    template = fragment_template(EVENT_CARD_TEMPLATE)
+    values = [EVENT[field] for field in template.fields]
+    assert template.render_fields(*values, color='"red"') == template.render(EVENT, '"red"')
+    assert 'color: &quot;red&quot;' in template.render(EVENT, '"red"')
+
+
+def test_missing_fields_render_empty():
+    columns = EventColumns.from_records([{'country': 'Thailand', 'date': '09 October 2025', 'title': 'Webinar'}])
+    [html] = fragment_template(EVENT_CARD_TEMPLATE).render_columns(columns)
+    assert 'href=""' in html
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import urllib.error
+import urllib.request
+
+import pytest
+
+from itsmf_http import HttpClient
+from itsmf_tiles import (HttpTileFetcher, TileStore, check_tile_url, export_tiles, iter_tiles, max_zoom,
+                         prefetch, run_prefetch, serve, tile_url, tile_xy)
+
+CHAPTERS = [
+    {'lat': 13.7563, 'lon': 100.5018},
+    {'lat': -37.8136, 'lon': 144.9631},
+]
+
+
+class FakeFetcher:
+    """Returns a small payload per tile, failing for the tiles in `fail`."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+
+    async def fetch(self, z, x, y):
+        self.calls.append((z, x, y))
+        if (z, x, y) in self.fail:
+            return None
+        return f"{z}/{x}/{y}".encode()
+
+
+def test_tile_xy():
+    assert tile_xy(0.0, 0.0, 0) == (0, 0)
+    assert tile_xy(85.0, -180.0, 2) == (0, 0)
+    assert tile_xy(-85.0, 179.9, 2) == (3, 3)
+
+
+def test_prefetch_and_rerun(tmp_path):
+    path = str(tmp_path / 'tiles.mbtiles')
+    fetcher = FakeFetcher()
+    bbox, total, fetched, failed = run_prefetch(CHAPTERS, zooms=(2, 4), path=path, fetcher=fetcher)
+    assert total == len(list(iter_tiles(bbox, (2, 4))))
+    assert (fetched, failed) == (total, 0)
+    assert max_zoom(path) == 4
+    with TileStore(path) as store:
+        z, x, y = fetcher.calls[0]
+        assert store.get(z, x, y) == f"{z}/{x}/{y}".encode()
+        assert store.metadata()['maxzoom'] == '4'
+
+    # Everything is stored, so nothing is fetched again
+    rerun = FakeFetcher()
+    assert run_prefetch(CHAPTERS, zooms=(2, 4), path=path, fetcher=rerun)[2:] == (0, 0)
+    assert rerun.calls == []
+
+
+def test_failed_tiles_are_fetched_on_the_next_run(tmp_path):
+    path = str(tmp_path / 'tiles.mbtiles')
+    tiles = list(iter_tiles((-40.0, 100.0, 15.0, 150.0), (3, 3)))
+    with TileStore(path) as store:
+        assert asyncio.run(prefetch(store, tiles, FakeFetcher(fail=tiles[:2]), batch=2)) == (len(tiles) - 2, 2)
+        assert store.missing(tiles) == tiles[:2]
+        rerun = FakeFetcher()
+        assert asyncio.run(prefetch(store, tiles, rerun)) == (2, 0)
+        assert sorted(rerun.calls) == sorted(tiles[:2])
+
+
+def test_export_skips_unchanged_tiles(tmp_path):
+    path = str(tmp_path / 'tiles.mbtiles')
+    run_prefetch(CHAPTERS, zooms=(2, 2), path=path, fetcher=FakeFetcher())
+    written, zoom = export_tiles(str(tmp_path / 'site'), path)
+    assert written > 0 and zoom == 2
+    assert os.path.exists(tmp_path / 'site' / 'tiles' / '2' / '3' / '2.png')
+    assert export_tiles(str(tmp_path / 'site'), path) == (0, 2)
+
+    # A changed tile of the same size is exported again
+    with TileStore(path) as store:
+        store.put_many([(2, 3, 2, b'2/3/X')])
+    assert export_tiles(str(tmp_path / 'site'), path) == (1, 2)
+    assert (tmp_path / 'site' / 'tiles' / '2' / '3' / '2.png').read_bytes() == b'2/3/X'
+
+
+@pytest.mark.parametrize('url', ['https://tile.openstreetmap.org/{z}/{x}/{y}.png',
+                                 'https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png',
+                                 'https://tiles.example.org/{z}/{x}.png'])
+def test_bulk_download_urls_are_refused(url, tmp_path):
+    with pytest.raises(ValueError):
+        check_tile_url(url)
+    with pytest.raises(ValueError):
+        run_prefetch(CHAPTERS, path=str(tmp_path / 'tiles.mbtiles'), url=url, contact='maps@example.org')
+
+
+def test_download_needs_contact_details(tmp_path):
+    with pytest.raises(ValueError):
+        run_prefetch(CHAPTERS, path=str(tmp_path / 'tiles.mbtiles'), url='https://tiles.example.org/{z}/{x}/{y}.png')
+
+
+def test_tile_server_and_http_fetcher(tmp_path):
+    # The tile server stands in for a remote tile source of a second store
+    source = TileStore(str(tmp_path / 'source.mbtiles'))
+    source.put_many([(2, 3, 2, b'tile-2-3-2'), (3, 6, 4, b'tile-3-6-4')])
+    server = serve(source, port=0)
+    try:
+        url = tile_url(server)
+        with urllib.request.urlopen(url.format(z=2, x=3, y=2)) as response:
+            assert response.read() == b'tile-2-3-2'
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url.format(z=2, x=0, y=0))
+
+        with TileStore(str(tmp_path / 'copy.mbtiles')) as store, HttpClient(timeout=2) as client:
+            fetched, failed = asyncio.run(prefetch(store, [(2, 3, 2), (3, 6, 4), (2, 0, 0)],
+                                                   HttpTileFetcher(client, url)))
+            assert (fetched, failed) == (2, 1)
+            assert store.get(3, 6, 4) == b'tile-3-6-4'
+    finally:
+        server.shutdown()
+        source.close()